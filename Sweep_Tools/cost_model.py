@@ -0,0 +1,309 @@
+"""
+Runtime cost model and ETA predictor built from historical run metadata.
+
+Every run records its parameters, measured wall time and peak memory in a
+SQLite history file. Per workflow, a log-linear regression
+
+    log(t) = a0 + sum_i a_i * log(feature_i)
+
+is fitted on physically motivated features (FDTD cell count, time steps and
+frequency points for the ring sweeps; the numeric parameters otherwise). It
+predicts runtime and memory for a planned sweep, gives live ETAs while the
+sweep runs, and provides the estimates used by job_queue for longest-job-first
+ordering and for packing jobs onto license seats.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import psutil
+
+c = 299792458.0
+default_history = "run_history.sqlite"
+
+
+# ---- Features ----
+def fdtd_features(params):
+    """
+    Cost features of a 3D FDTD run (rr_gap / rr_add_drop parameters):
+    cell count, number of time steps and monitor frequency points. Runs that
+    did not record the FDTD region and simulation time fall back to their
+    numeric parameters.
+    """
+    if any(k not in params for k in ("x_span", "y_span", "z_span", "simulation_time")):
+        return numeric_features(params)
+    dx = params.get("mesh_step") or params.get("wl_start", 1.5e-6) / (params.get("n_max", 3.48) * 10)
+    cells = params["x_span"] * params["y_span"] * params["z_span"] / dx**3
+    dt = 0.99 * dx / (c * np.sqrt(3))
+    steps = params["simulation_time"] / dt
+    return {"cells": cells, "steps": steps, "freq_points": params.get("num_freq_points", 1)}
+
+
+def numeric_features(params):
+    """Every positive numeric parameter is used as a feature."""
+    return {k: float(v) for k, v in sorted(params.items())
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0}
+
+
+workflow_features = {
+    "rr_gap": fdtd_features,
+    "rr_add_drop": fdtd_features,
+}
+
+
+def features(workflow, params):
+    return workflow_features.get(workflow, numeric_features)(params)
+
+
+# ---- Run History ----
+class RunHistory:
+    """Wall time and peak memory of past runs, keyed by workflow and parameters."""
+
+    def __init__(self, db_path=default_history):
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workflow TEXT NOT NULL,
+                params TEXT NOT NULL,
+                wall_time REAL NOT NULL,
+                peak_memory REAL,
+                recorded REAL NOT NULL
+            )""")
+
+    def add(self, workflow, params, wall_time, peak_memory=None):
+        self.db.execute("INSERT INTO runs (workflow, params, wall_time, peak_memory, recorded) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (workflow, json.dumps(params), float(wall_time), peak_memory, time.time()))
+
+    def runs(self, workflow):
+        rows = self.db.execute("SELECT params, wall_time, peak_memory FROM runs WHERE workflow = ?",
+                               (workflow,)).fetchall()
+        return [(json.loads(p), t, m) for p, t, m in rows]
+
+    @contextmanager
+    def record(self, workflow, params, pid=None):
+        """
+        Times the enclosed block and stores it with the peak memory of the
+        solver process tree during that block only (see PeakMemory).
+        """
+        t0 = time.perf_counter()
+        with PeakMemory(pid) as memory:
+            yield
+        self.add(workflow, params, time.perf_counter() - t0, memory.peak)
+
+
+class PeakMemory:
+    """
+    Samples the summed resident memory (bytes) of a process and all its
+    descendants in a background thread and keeps the peak over the with
+    block. The default root is this process, whose tree includes the solver
+    engines started by lumapi (and an in-process ZOS-API standalone
+    application); pass the PID of an already running OpticStudio or
+    Lumerical instance to measure that one instead.
+    """
+
+    def __init__(self, pid=None, interval=0.2):
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+
+    def sample(self):
+        try:
+            root = psutil.Process(self.pid)
+            procs = [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+        total = 0
+        for proc in procs:
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        self.peak = max(self.peak or 0, total)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+# ---- Regression Model ----
+class CostModel:
+    """Log-linear ridge regression of wall time and memory on workflow features."""
+
+    def __init__(self, history, workflow, ridge=1e-3):
+        self.workflow = workflow
+        runs = history.runs(workflow)
+        if not runs:
+            raise ValueError(f"No recorded runs for workflow '{workflow}'")
+        feats = [features(workflow, p) for p, _, _ in runs]
+        # Features recorded by most runs; older runs lacking them are left out of the fit
+        counts = {}
+        for f in feats:
+            for n in f:
+                counts[n] = counts.get(n, 0) + 1
+        self.names = sorted(n for n, k in counts.items() if 2*k >= len(runs))
+        keep = [i for i, f in enumerate(feats) if all(n in f for n in self.names)]
+        if not keep:
+            self.names = sorted(set.intersection(*[set(f) for f in feats]))
+            keep = list(range(len(runs)))
+        runs = [runs[i] for i in keep]
+        feats = [feats[i] for i in keep]
+        X = self._design(feats)
+        self.time = self._fit(X, np.log([t for _, t, _ in runs]), ridge)
+        mem = [(x, np.log(m)) for x, (_, _, m) in zip(X, runs) if m]
+        self.memory = self._fit(np.array([x for x, _ in mem]), np.array([m for _, m in mem]), ridge) \
+            if mem else None
+        self.n_runs = len(runs)
+
+    def _design(self, feats):
+        # Features missing from a point are NaN here and predicted at the training mean
+        return np.array([[1.0] + [np.log(f[n]) if n in f else np.nan for n in self.names] for f in feats])
+
+    @staticmethod
+    def _fit(X, y, ridge):
+        # Ridge keeps the fit defined while there are fewer runs than features
+        scale = np.r_[1.0, np.maximum(X[:, 1:].std(axis=0), 1e-12)]
+        center = np.r_[0.0, X[:, 1:].mean(axis=0)]
+        Xs = (X - center) / scale
+        penalty = ridge * np.diag(np.r_[0.0, np.ones(X.shape[1] - 1)])
+        coef = np.linalg.solve(Xs.T @ Xs + penalty, Xs.T @ y)
+        dof = max(len(y) - X.shape[1], 1)
+        sigma = np.sqrt(np.sum((Xs @ coef - y)**2) / dof) if len(y) > X.shape[1] else np.nan
+        return {"coef": coef, "center": center, "scale": scale, "sigma": sigma}
+
+    def _predict(self, fit, params_list):
+        X = self._design([features(self.workflow, p) for p in params_list])
+        X = np.where(np.isnan(X), fit["center"], X)
+        log_y = ((X - fit["center"]) / fit["scale"]) @ fit["coef"]
+        return np.exp(log_y), fit["sigma"]
+
+    def predict_time(self, params_list):
+        """Predicted wall time (s) and the log-space residual std (NaN until enough runs exist)."""
+        return self._predict(self.time, params_list)
+
+    def predict_memory(self, params_list):
+        """Predicted peak memory (bytes), or None if no memory was ever recorded."""
+        return self._predict(self.memory, params_list)[0] if self.memory else None
+
+
+# ---- Sweep Planning ----
+def pack_jobs(estimates, seats, memory=None, memory_limit=None):
+    """
+    Longest-processing-time-first packing of jobs onto seats. If memory and
+    memory_limit are given, a job is only placed where the jobs overlapping
+    its whole run [start, start + estimate) stay under the limit; otherwise it
+    waits for the next overlapping job to finish. A job that exceeds the limit
+    on its own runs when nothing else overlaps it.
+    Returns the job order, per-job (seat, start) and the predicted makespan.
+    """
+    order = [int(j) for j in np.argsort(estimates)[::-1]]
+    free_at = np.zeros(seats)
+    placed = []
+    for j in order:
+        seat = int(np.argmin(free_at))
+        start = free_at[seat]
+        if memory is not None and memory_limit is not None:
+            while True:
+                end = start + estimates[j]
+                overlap = [(k, t0) for k, _, t0 in placed if t0 < end and start < t0 + estimates[k]]
+                # Peak usage inside the interval is reached at its start or at a later job start
+                times = [start] + [t0 for _, t0 in overlap if t0 > start]
+                peak = max(sum(memory[k] for k, t0 in overlap if t0 <= t < t0 + estimates[k]) for t in times)
+                if not overlap or peak + memory[j] <= memory_limit:
+                    break
+                start = min(t0 + estimates[k] for k, t0 in overlap if t0 + estimates[k] > start)
+        placed.append((j, seat, float(start)))
+        free_at[seat] = start + estimates[j]
+    schedule = {j: (seat, start) for j, seat, start in placed}
+    return order, schedule, float(max(start + estimates[j] for j, _, start in placed)) if placed else 0.0
+
+
+def plan_sweep(model, points, seats=1, memory_limit=None):
+    """Predicted runtime and memory per point plus the packed makespan on the given seats."""
+    t, sigma = model.predict_time(points)
+    mem = model.predict_memory(points)
+    order, schedule, makespan = pack_jobs(t, seats, mem, memory_limit)
+    return {"time": t, "sigma": sigma, "memory": mem, "order": order,
+            "schedule": schedule, "makespan": makespan, "total": float(np.sum(t))}
+
+
+# ---- Live ETA ----
+class SweepETA:
+    """
+    Remaining-time estimate during a sweep. Predictions for the remaining
+    points are rescaled by the ratio of measured to predicted time so far.
+    """
+
+    def __init__(self, predicted, seats=1):
+        self.predicted = np.asarray(predicted, dtype=float)
+        self.seats = seats
+        self.done = {}
+        self.t0 = time.time()
+
+    def finished(self, index, wall_time):
+        self.done[index] = wall_time
+
+    def calibration(self):
+        if not self.done:
+            return 1.0
+        idx = list(self.done)
+        return sum(self.done.values()) / max(self.predicted[idx].sum(), 1e-12)
+
+    def remaining(self):
+        left = [i for i in range(len(self.predicted)) if i not in self.done]
+        return self.calibration() * self.predicted[left].sum() / self.seats
+
+    def status(self):
+        eta = time.strftime("%H:%M:%S", time.localtime(time.time() + self.remaining()))
+        return (f"{len(self.done)}/{len(self.predicted)} done, "
+                f"~{self.remaining()/60:.1f} min left (ETA {eta})")
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    # rr_gap region: 11 x 11 x 2 um, 500 frequency points
+    base = {"x_span": 11e-6, "y_span": 11e-6, "z_span": 2e-6, "wl_start": 1.5e-6,
+            "simulation_time": 4000e-15, "num_freq_points": 500}
+    history_file = "demo_run_history.sqlite"
+    if os.path.exists(history_file):
+        os.remove(history_file)
+    history = RunHistory(history_file)
+
+    # Synthetic history standing in for recorded runs
+    rng = np.random.default_rng(1)
+    for sim_time in [1000e-15, 2000e-15, 4000e-15]:
+        for mesh_step in [30e-9, 40e-9, 50e-9]:
+            p = dict(base, simulation_time=sim_time, mesh_step=mesh_step)
+            f = fdtd_features(p)
+            t = 2e-8 * f["cells"] * f["steps"] ** 1.0 * rng.lognormal(0, 0.05)
+            history.add("rr_gap", p, t, 200 * f["cells"] * rng.lognormal(0, 0.02))
+
+    model = CostModel(history, "rr_gap")
+    gaps = [dict(base, mesh_step=35e-9, gap=g) for g in [50e-9, 60e-9, 70e-9, 100e-9]]
+    plan = plan_sweep(model, gaps, seats=2)
+    for p, t, m in zip(gaps, plan["time"], plan["memory"]):
+        print(f"gap = {p['gap']*1e9:5.0f} nm: {t/60:6.1f} min, {m/2**30:5.2f} GiB")
+    print(f"Serial total {plan['total']/3600:.2f} h, makespan on 2 seats {plan['makespan']/3600:.2f} h "
+          f"(log-residual {plan['sigma']:.3f})")
+
+    eta = SweepETA(plan["time"], seats=2)
+    eta.finished(0, plan["time"][0] * 1.2)
+    print(eta.status())
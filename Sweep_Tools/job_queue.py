@@ -0,0 +1,342 @@
+"""
+License-aware local job queue and scheduler for simulation runs.
+
+Scripts submit sweep points (one job per point) to a shared SQLite queue file
+instead of starting their own solver sessions. A single scheduler process per
+machine dispatches the queued jobs against a configured number of license seats
+per product (FDTD, MODE, OpticStudio), longest job first, and retries
+transient failures such as a license checkout timing out.
+
+Each job names a target "module:function" (or "path/to/file.py:function")
+that is called with the job parameters in its own worker process; targets.py
+holds one per-point target for each sweep script. The stand-in
+backend `sleep_job` lets the whole queue be exercised on a Linux box without
+any solver installed:
+
+    python job_queue.py demo
+"""
+import importlib
+import importlib.util
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (Lumerical and OpticStudio hosts)
+    fcntl = None
+    import msvcrt
+
+from cost_model import PeakMemory, RunHistory, default_history
+from results_catalog import ResultsCatalog, default_catalog
+
+# ---- Configuration ----
+# One queue per machine, wherever a script is started from: C:\ProgramData on
+# Windows, /var/tmp elsewhere. Point SWEEP_QUEUE_DB at a group-writable file
+# if several users share the seats.
+shared_dir = os.environ.get("PROGRAMDATA") if os.name == "nt" else "/var/tmp"
+default_db = os.environ.get("SWEEP_QUEUE_DB",
+                            os.path.join(shared_dir or tempfile.gettempdir(), "sweep_tools", "jobs.sqlite"))
+default_seats = {"FDTD": 1, "MODE": 1, "OpticStudio": 1}
+
+# Solver product used by each workflow in this repository
+workflow_products = {
+    "rr_gap": "FDTD",
+    "rr_add_drop": "FDTD",
+    "h_sweep": "MODE",
+    "opa": "MODE",
+    "waveguide_mode_plotter": "MODE",
+    "ball_lens_sweep": "OpticStudio",
+    "ball_achromat": "OpticStudio",
+}
+
+# Worker exit code for failures worth retrying (EX_TEMPFAIL)
+exit_transient = 75
+
+
+class TransientError(Exception):
+    """Raised by a job target for failures that should be retried (e.g. no license seat)."""
+
+
+# ---- Queue Storage ----
+schema = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow TEXT NOT NULL,
+    product TEXT NOT NULL,
+    target TEXT NOT NULL,
+    params TEXT NOT NULL,
+    estimate REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_retries INTEGER NOT NULL DEFAULT 2,
+    not_before REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    peak_memory REAL,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dispatch ON jobs (state, product, estimate);
+"""
+
+
+class JobQueue:
+    """Persistent job queue shared by every script and user on the machine."""
+
+    def __init__(self, db_path=default_db):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(schema)
+
+    def submit(self, workflow, target, params, product=None, estimate=0.0, max_retries=2):
+        """
+        Queues one sweep point and returns its job id. Relative paths in
+        parameters named *_dir or *_file are made absolute here, since the
+        worker runs in the scheduler's working directory.
+        """
+        product = product or workflow_products[workflow]
+        params = {k: os.path.abspath(v) if isinstance(v, str) and k.endswith(("_dir", "_file")) else v
+                  for k, v in params.items()}
+        cur = self.db.execute(
+            "INSERT INTO jobs (workflow, product, target, params, estimate, max_retries, submitted) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (workflow, product, target, json.dumps(params), float(estimate), max_retries, time.time()))
+        return cur.lastrowid
+
+    def submit_sweep(self, workflow, target, points, product=None, estimates=None, max_retries=2):
+        """Queues every parameter dict in points; returns the list of job ids."""
+        estimates = estimates if estimates is not None else [0.0] * len(points)
+        return [self.submit(workflow, target, p, product, e, max_retries)
+                for p, e in zip(points, estimates)]
+
+    def job(self, job_id):
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def results(self, job_ids):
+        """Results of finished jobs in submission order (None for failed or pending ones)."""
+        return [self.job(i)["result"] for i in job_ids]
+
+    def wait(self, job_ids, poll=1.0):
+        """Blocks until all given jobs are done or failed."""
+        marks = ",".join("?" * len(job_ids))
+        while self.db.execute(f"SELECT COUNT(*) FROM jobs WHERE id IN ({marks}) "
+                              "AND state NOT IN ('done', 'failed')", job_ids).fetchone()[0]:
+            time.sleep(poll)
+
+    def counts(self):
+        """Number of jobs per (product, state)."""
+        rows = self.db.execute("SELECT product, state, COUNT(*) FROM jobs GROUP BY product, state")
+        return {(p, s): n for p, s, n in rows}
+
+    # ---- Scheduler Side ----
+    def _next(self, product, limit):
+        # Longest job first among those due; ties keep submission order
+        return self.db.execute(
+            "SELECT id FROM jobs WHERE state = 'queued' AND product = ? AND not_before <= ? "
+            "ORDER BY estimate DESC, id ASC LIMIT ?", (product, time.time(), limit)).fetchall()
+
+    def _set(self, job_id, **fields):
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        self.db.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+
+# ---- Worker ----
+def load_target(target):
+    """Resolves "module:function" or "path/to/file.py:function" to a callable."""
+    module_name, func_name = target.rsplit(":", 1)
+    if module_name.endswith(".py"):
+        spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(module_name))[0],
+                                                      module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, func_name)
+
+
+def run_job(db_path, job_id):
+    """Runs one job in the current process; returns the worker exit code."""
+    queue = JobQueue(db_path)
+    job = queue.job(job_id)
+    try:
+        # Fresh per job: the worker's own tree, including any solver it starts
+        with PeakMemory() as memory:
+            result = load_target(job["target"])(**job["params"])
+        queue._set(job_id, result=json.dumps(result), error=None, peak_memory=memory.peak)
+        return 0
+    except Exception as e:
+        queue._set(job_id, error=traceback.format_exc())
+        # Matched by name so targets can define their own TransientError
+        # without importing this module
+        return exit_transient if type(e).__name__ == "TransientError" else 1
+
+
+# ---- Scheduler ----
+def _lock(f):
+    """Non-blocking exclusive lock on an open file; False if another process holds it."""
+    try:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def run_scheduler(db_path=default_db, seats=None, poll=0.5, exit_when_idle=False, history=None,
+                  catalog=None, retry_delay=60.0, log=print):
+    """
+    Dispatches queued jobs until stopped (or until the queue drains when
+    exit_when_idle is set). Only one scheduler may own a queue file at a time.
+    A transient failure is retried after retry_delay seconds, doubling with
+    every attempt, so a seat held elsewhere has time to become free.
+    Finished jobs are added to history (a cost_model.RunHistory) and to
+    catalog (a results_catalog.ResultsCatalog, with any "artifacts" listed in
+    the job result) when given. Both record the job parameters completed by
+    the "params" the target reports in its result.
+    """
+    seats = dict(default_seats, **(seats or {}))
+    queue = JobQueue(db_path)
+    lock = open(queue.db_path + ".lock", "w")
+    if not _lock(lock):
+        lock.close()
+        raise RuntimeError(f"Another scheduler is already running on {queue.db_path}")
+
+    # Jobs left 'running' by a scheduler that died go back to the queue
+    queue.db.execute("UPDATE jobs SET state = 'queued' WHERE state = 'running'")
+    running = {}
+    log(f"Scheduler started on {queue.db_path} with seats {seats}")
+    try:
+        while True:
+            for job_id, (proc, product) in list(running.items()):
+                code = proc.poll()
+                if code is None:
+                    continue
+                del running[job_id]
+                job = queue.job(job_id)
+                if code == 0:
+                    wall_time = time.time() - job["started"]
+                    queue._set(job_id, state="done", finished=time.time())
+                    result = job["result"]
+                    # Targets may report their full effective parameters (region, mesh, ...)
+                    params = dict(job["params"], **(result.get("params", {}) if isinstance(result, dict) else {}))
+                    if history is not None:
+                        history.add(job["workflow"], params, wall_time, job["peak_memory"])
+                    if catalog is not None:
+                        artifacts = result.get("artifacts", []) if isinstance(result, dict) else []
+                        catalog.add_run(job["workflow"], params, artifacts)
+                    log(f"[{product}] job {job_id} done in {wall_time:.1f} s")
+                elif code == exit_transient and job["attempts"] <= job["max_retries"]:
+                    delay = retry_delay * 2**(job["attempts"] - 1)
+                    queue._set(job_id, state="queued", not_before=time.time() + delay)
+                    log(f"[{product}] job {job_id} transient failure, retry {job['attempts']}/{job['max_retries']} "
+                        f"in {delay:g} s")
+                else:
+                    queue._set(job_id, state="failed", finished=time.time())
+                    log(f"[{product}] job {job_id} failed (exit code {code})")
+
+            for product, n_seats in seats.items():
+                free = n_seats - sum(1 for _, p in running.values() if p == product)
+                if free <= 0:
+                    continue
+                for row in queue._next(product, free):
+                    job_id = row["id"]
+                    queue.db.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, "
+                                     "started = ? WHERE id = ?", (time.time(), job_id))
+                    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "run",
+                                             queue.db_path, str(job_id)])
+                    running[job_id] = (proc, product)
+
+            if exit_when_idle and not running and not queue.db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]:
+                break
+            time.sleep(poll)
+    finally:
+        for proc, _ in running.values():
+            proc.terminate()
+        _unlock(lock)
+        lock.close()
+
+
+# ---- Stand-in Backend ----
+def sleep_job(duration, fail_first=0, attempt_file=None, **params):
+    """
+    Stand-in for a solver run: sleeps for `duration` seconds and echoes its
+    parameters. The first `fail_first` attempts raise TransientError
+    (attempts are counted in attempt_file).
+    """
+    if fail_first:
+        n = int(open(attempt_file).read()) if os.path.exists(attempt_file) else 0
+        with open(attempt_file, "w") as f:
+            f.write(str(n + 1))
+        if n < fail_first:
+            raise TransientError(f"License seat unavailable (attempt {n + 1})")
+    time.sleep(duration)
+    return {"duration": duration, "pid": os.getpid(), **params}
+
+
+def demo(db_path="demo_jobs.sqlite"):
+    """Runs a mixed FDTD / MODE / OpticStudio sweep through stand-in workers."""
+    import tempfile
+
+    for ext in ("", "-wal", "-shm", ".lock"):
+        if os.path.exists(db_path + ext):
+            os.remove(db_path + ext)
+    queue = JobQueue(db_path)
+    target = f"{os.path.abspath(__file__)}:sleep_job"
+    tmp = tempfile.mkdtemp()
+
+    ids = queue.submit_sweep("rr_gap", target, [{"duration": g / 50, "gap_nm": g} for g in (50, 60, 70, 100)],
+                             estimates=[g / 50 for g in (50, 60, 70, 100)])
+    ids += queue.submit_sweep("h_sweep", target, [{"duration": 0.5, "point": i} for i in range(4)],
+                              estimates=[0.5] * 4)
+    ids += [queue.submit("ball_lens_sweep", target,
+                         {"duration": 0.3, "fail_first": 1, "attempt_file": os.path.join(tmp, "n")},
+                         estimate=0.3)]
+
+    t0 = time.time()
+    run_scheduler(db_path, seats={"FDTD": 2, "MODE": 2, "OpticStudio": 1}, exit_when_idle=True, retry_delay=0.5)
+    print(f"\n{len(ids)} jobs finished in {time.time() - t0:.1f} s")
+    for job_id in ids:
+        job = queue.job(job_id)
+        print(f"  job {job_id:2d} {job['workflow']:<16} {job['state']:<7} attempts={job['attempts']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "run":
+        sys.exit(run_job(sys.argv[2], int(sys.argv[3])))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        # python job_queue.py serve [queue.sqlite] [seats.json]; default queue: $SWEEP_QUEUE_DB
+        db = sys.argv[2] if len(sys.argv) > 2 else default_db
+        seats = json.load(open(sys.argv[3])) if len(sys.argv) > 3 else None
+        # History and catalog live next to the queue, not in the directory serve was started from
+        folder = os.path.dirname(os.path.abspath(db))
+        os.makedirs(folder, exist_ok=True)
+        run_scheduler(db, seats, history=RunHistory(os.path.join(folder, default_history)),
+                      catalog=ResultsCatalog(os.path.join(folder, default_catalog)))
+    else:
+        demo()
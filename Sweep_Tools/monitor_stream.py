@@ -0,0 +1,143 @@
+"""
+Subset and streaming retrieval of large Lumerical monitor datasets.
+
+getresult()/getdata() on a frequency-domain monitor such as the 8 x 9 um
+field_profile of rr_add_drop (500 frequency points) copies the full 4D array
+through the API. This module slices inside the Lumerical session instead.
+Only the requested frequencies and spatial window leave the solver, one chunk
+at a time, and each chunk goes straight into .npy files opened as memory
+maps. Peak Python memory is bounded by max_chunk_bytes, however large the
+monitor is.
+
+    data = stream_monitor(fdtd, "field_profile", "field_subset",
+                          wavelengths=[1.5312e-6, 1.5547e-6], x_range=(-2e-6, 2e-6))
+    data["Ey"][:, :, 0, 1]   # read lazily from disk
+"""
+import json
+import os
+
+import numpy as np
+
+c = 299792458.0
+
+
+# ---- Index Selection ----
+def _axis_slice(axis, bounds):
+    """1-based inclusive index range covering bounds (min, max) on axis."""
+    if bounds is None or len(axis) == 1:
+        return 1, len(axis)
+    idx = np.nonzero((axis >= bounds[0]) & (axis <= bounds[1]))[0]
+    if not len(idx):
+        raise ValueError(f"No grid points between {bounds[0]:.4g} and {bounds[1]:.4g}")
+    return int(idx[0]) + 1, int(idx[-1]) + 1
+
+
+def _frequency_indices(f, wavelengths=None, frequencies=None):
+    """1-based indices of the monitor frequencies nearest to the requested ones (all if none given)."""
+    if wavelengths is not None:
+        frequencies = c / np.asarray(wavelengths, dtype=float)
+    if frequencies is None:
+        return list(range(1, len(f) + 1))
+    return sorted({int(np.argmin(np.abs(f - fi))) + 1 for fi in np.atleast_1d(frequencies)})
+
+
+# ---- Streaming Extraction ----
+def stream_monitor(sim, monitor, out_dir, components=("Ex", "Ey", "Ez"), wavelengths=None,
+                   frequencies=None, x_range=None, y_range=None, z_range=None,
+                   max_chunk_bytes=64e6):
+    """
+    Copies a frequency subset and spatial window of monitor field components
+    into out_dir/<component>.npy (shape nx, ny, nz, nf) plus the x/y/z/f
+    axes. Returns the arrays as read-only memory maps.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    axes = {a: np.asarray(sim.getdata(monitor, a)).ravel() for a in ("x", "y", "z", "f")}
+    sx = _axis_slice(axes["x"], x_range)
+    sy = _axis_slice(axes["y"], y_range)
+    sz = _axis_slice(axes["z"], z_range)
+    fi = _frequency_indices(axes["f"], wavelengths, frequencies)
+    shape = (sx[1] - sx[0] + 1, sy[1] - sy[0] + 1, sz[1] - sz[0] + 1, len(fi))
+
+    # Rows of x per chunk so that one chunk of one frequency stays under the budget
+    row_bytes = shape[1] * shape[2] * np.dtype(complex).itemsize
+    rows = int(max(1, min(shape[0], max_chunk_bytes // row_bytes)))
+
+    for name, a, s in (("x", axes["x"], sx), ("y", axes["y"], sy), ("z", axes["z"], sz)):
+        np.save(os.path.join(out_dir, f"{name}.npy"), a[s[0]-1:s[1]])
+    np.save(os.path.join(out_dir, "f.npy"), axes["f"][np.array(fi) - 1])
+
+    for comp in components:
+        out = np.lib.format.open_memmap(os.path.join(out_dir, f"{comp}.npy"), mode="w+",
+                                        dtype=complex, shape=shape)
+        # The full dataset is loaded once inside the solver process only
+        sim.eval(f'_stream_full = getdata("{monitor}", "{comp}");')
+        for k, f_idx in enumerate(fi):
+            for x0 in range(sx[0], sx[1] + 1, rows):
+                x1 = min(x0 + rows - 1, sx[1])
+                sim.eval(f"_stream_chunk = _stream_full({x0}:{x1}, {sy[0]}:{sy[1]}, "
+                         f"{sz[0]}:{sz[1]}, {f_idx});")
+                chunk = np.asarray(sim.getv("_stream_chunk"))
+                out[x0 - sx[0]:x1 - sx[0] + 1, :, :, k] = chunk.reshape(x1 - x0 + 1, shape[1], shape[2])
+        out.flush()
+        del out
+        sim.eval("clear(_stream_full, _stream_chunk);")
+
+    with open(os.path.join(out_dir, "monitor.json"), "w") as f:
+        json.dump({"monitor": monitor, "components": list(components), "shape": shape,
+                   "frequency_indices": fi}, f, indent=2)
+    return load_stream(out_dir)
+
+
+def load_stream(out_dir):
+    """Opens a streamed monitor subset as read-only memory maps."""
+    with open(os.path.join(out_dir, "monitor.json")) as f:
+        meta = json.load(f)
+    data = {a: np.load(os.path.join(out_dir, f"{a}.npy")) for a in ("x", "y", "z", "f")}
+    for comp in meta["components"]:
+        data[comp] = np.load(os.path.join(out_dir, f"{comp}.npy"), mmap_mode="r")
+    return data
+
+
+# ---- Spectra ----
+def monitor_spectrum(sim, monitor, wl_min=None, wl_max=None):
+    """
+    Power transmission of a monitor restricted to [wl_min, wl_max], sliced in
+    the session (replaces getresult(monitor, "T") when only a band is needed).
+    Returns (wavelengths, T).
+    """
+    f = np.asarray(sim.getdata(monitor, "f")).ravel()
+    wl = c / f
+    lo = wl_min if wl_min is not None else wl.min()
+    hi = wl_max if wl_max is not None else wl.max()
+    idx = np.nonzero((wl >= lo) & (wl <= hi))[0]
+    if not len(idx):
+        raise ValueError(f"No monitor frequencies between {lo:.4g} and {hi:.4g} m")
+    sim.eval(f'_stream_T = transmission("{monitor}"); _stream_T = _stream_T({idx[0]+1}:{idx[-1]+1});')
+    T = np.asarray(sim.getv("_stream_T")).ravel()
+    sim.eval("clear(_stream_T);")
+    return wl[idx[0]:idx[-1]+1], T
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import sys
+    from scipy.signal import find_peaks
+
+    # --- MODIFY THIS LINE IF YOUR LUMERICAL INSTALLATION IS DIFFERENT ---
+    lumapi_path = r"C:\Program Files\Lumerical\v241\api\python"
+    if lumapi_path not in sys.path:
+        sys.path.append(lumapi_path)
+    import lumapi
+
+    with lumapi.FDTD(hide=True) as fdtd:
+        # Run ring_resonator_add_drop.fsp first; the script only builds it
+        fdtd.load("ring_resonator_add_drop.fsp")
+        wl, T = monitor_spectrum(fdtd, "transmission", 1.53e-6, 1.57e-6)
+        # Two most prominent dips, i.e. two separate resonances (not two points of one dip)
+        dips, props = find_peaks(-np.abs(T), prominence=0)
+        resonances = np.sort(wl[dips[np.argsort(props["prominences"])[::-1][:2]]])
+        print("Resonances (nm):", np.round(resonances * 1e9, 2))
+        data = stream_monitor(fdtd, "field_profile", "field_profile_resonances",
+                              components=("Ey",), wavelengths=resonances,
+                              x_range=(-4e-6, 4e-6), y_range=(-4.5e-6, 4.5e-6))
+        print("Streamed Ey subset:", data["Ey"].shape)
@@ -0,0 +1,185 @@
+"""
+Asynchronous pipelined sweep driver.
+
+The sweep scripts run strictly serially (set geometry, solve, pull data,
+post-process, print), so the solver idles during post-processing such as the
+h_sweep intensity integration, Zemax GIA text parsing or rr_gap
+normalization. This driver splits a sweep point into three stages and
+overlaps them with asyncio:
+
+    prepare(point) -> params          worker pool
+    solve(session, params) -> raw     one dedicated solver thread
+    postprocess(raw) -> result        thread or process pool
+
+While the solver works on point k, point k+1 is being prepared and point k-1
+post-processed. Bounded queues between the stages apply backpressure, so
+fetched raw data never piles up in memory.
+
+The solver session (lumapi.MODE(), zospy connection, ...) is created by
+solver_init() on the solver thread itself and only used there, because
+COM-based APIs are tied to the thread that opened them.
+"""
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_done = object()
+
+
+# Items between the stages are (index, value, error); a point that failed in
+# an earlier stage carries its exception through and skips the later ones.
+async def _prepare_stage(points, prepare, pool, out_queue):
+    loop = asyncio.get_running_loop()
+    for index, point in enumerate(points):
+        try:
+            params = await loop.run_in_executor(pool, prepare, point) if prepare else point
+            await out_queue.put((index, params, None))
+        except Exception as e:
+            await out_queue.put((index, None, e))
+    await out_queue.put(_done)
+
+
+async def _solve_stage(solve, session, solver, in_queue, out_queue, stats):
+    loop = asyncio.get_running_loop()
+    while (item := await in_queue.get()) is not _done:
+        index, params, error = item
+        if error is None:
+            t0 = time.perf_counter()
+            try:
+                raw = await loop.run_in_executor(solver, solve, session, params)
+            except Exception as e:
+                raw, error = None, e
+            stats["solver_busy"] += time.perf_counter() - t0
+        await out_queue.put((index, None if error else raw, error))
+    await out_queue.put(_done)
+
+
+def _raise_first(done):
+    # Retrieve every exception (so none is reported as never retrieved), raise the first
+    errors = [task.exception() for task in done if not task.cancelled()]
+    for error in errors:
+        if error is not None:
+            raise error
+
+
+async def _post_stage(postprocess, pool, in_queue, results, stats, on_result, on_error, max_pending):
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    async def handle(index, raw, error):
+        if error is None:
+            try:
+                result = await loop.run_in_executor(pool, postprocess, raw) if postprocess else raw
+            except Exception as e:
+                error = e
+        if error is None:
+            results[index] = result
+            if on_result:
+                on_result(index, result)
+        else:
+            results[index] = error
+            stats["failed"] += 1
+            if on_error:
+                on_error(index, error)
+
+    try:
+        while (item := await in_queue.get()) is not _done:
+            pending.add(asyncio.ensure_future(handle(*item)))
+            if len(pending) >= max_pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                _raise_first(done)
+        if pending:
+            done, pending = await asyncio.wait(pending)
+            _raise_first(done)
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def run_pipeline(points, solve, prepare=None, postprocess=None, solver_init=None,
+                       solver_close=None, post_workers=2, post_processes=False,
+                       queue_size=2, on_result=None, on_error=None):
+    """
+    Runs every point through prepare -> solve -> postprocess with the stages
+    overlapped. Returns (results in point order, stats). With
+    post_processes=True the post-processing runs in a process pool (the
+    function must then be picklable).
+
+    An exception raised by prepare, solve or postprocess for one point is
+    stored in its results slot (and passed to on_error) and the sweep goes
+    on; stats["failed"] counts these points. If a stage itself stops (the
+    caller is cancelled, on_result raises, ...), the other stages are
+    cancelled too, so no stage is left waiting on a queue.
+    """
+    points = list(points)
+    results = [None] * len(points)
+    stats = {"points": len(points), "failed": 0, "solver_busy": 0.0}
+    loop = asyncio.get_running_loop()
+
+    solver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="solver")
+    prep_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prepare")
+    post_pool = (ProcessPoolExecutor if post_processes else ThreadPoolExecutor)(max_workers=post_workers)
+    opened = False
+    try:
+        session = await loop.run_in_executor(solver, solver_init) if solver_init else None
+        opened = True
+        t0 = time.perf_counter()
+        to_solver = asyncio.Queue(maxsize=queue_size)
+        to_post = asyncio.Queue(maxsize=queue_size)
+        tasks = [
+            asyncio.ensure_future(_prepare_stage(points, prepare, prep_pool, to_solver)),
+            asyncio.ensure_future(_solve_stage(solve, session, solver, to_solver, to_post, stats)),
+            asyncio.ensure_future(_post_stage(postprocess, post_pool, to_post, results, stats,
+                                              on_result, on_error, post_workers + queue_size)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    finally:
+        if solver_close and opened:
+            await loop.run_in_executor(solver, solver_close, session)
+        solver.shutdown()
+        prep_pool.shutdown()
+        post_pool.shutdown()
+    stats["wall_time"] = time.perf_counter() - t0
+    stats["solver_utilization"] = stats["solver_busy"] / max(stats["wall_time"], 1e-12)
+    return results, stats
+
+
+def pipelined_sweep(points, solve, **kwargs):
+    """Blocking wrapper around run_pipeline for use from the sweep scripts."""
+    return asyncio.run(run_pipeline(points, solve, **kwargs))
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import numpy as np
+
+    # Stand-ins shaped like h_sweep: positions -> solver fields -> gap confinement
+    def prepare(idx):
+        time.sleep(0.02)
+        return {"ag1_y": np.linspace(2.915e-6, 2.725e-6, 10)[idx],
+                "ag2_y": np.linspace(4.285e-6, 4.475e-6, 10)[idx]}
+
+    def solve(session, params):
+        time.sleep(0.3)    # setnamed + findmodes + getdata
+        y = np.linspace(0, 7e-6, 400)
+        field = np.exp(-((y - 0.5*(params["ag1_y"] + params["ag2_y"]))/1e-6)**2)
+        return {"params": params, "y": y, "E": np.outer(field, np.ones(300))}
+
+    def postprocess(raw):
+        time.sleep(0.25)   # intensity integration, plotting data, CSV rows
+        E_int = np.abs(raw["E"])**2
+        mask = (raw["y"] >= raw["params"]["ag1_y"]) & (raw["y"] <= raw["params"]["ag2_y"])
+        return 100 * E_int[mask].sum() / E_int.sum()
+
+    serial_estimate = 10 * (0.02 + 0.3 + 0.25)
+    results, stats = pipelined_sweep(
+        range(10), solve, prepare=prepare, postprocess=postprocess,
+        on_result=lambda i, r: print(f"[{i + 1}/10] {r:.2f} %"))
+    print(f"Pipelined: {stats['wall_time']:.2f} s (serial ~{serial_estimate:.2f} s), "
+          f"solver utilization {stats['solver_utilization']*100:.0f} %")
@@ -0,0 +1,145 @@
+"""
+Headless parallel rendering of mode-profile and spectrum figures.
+
+Figures are drawn with the non-interactive Agg backend in a process pool, so
+batch runs never block on plt.show(). Each worker keeps one figure per plot
+kind and only updates the data of its pcolormesh / lines between frames
+instead of rebuilding the figure, which makes hundreds of mode plots from a
+sweep cheap to write as PNG or SVG.
+
+    jobs = [mode_job(y, z, intensity, "mode1.png", title="Mode 1"), ...]
+    render(jobs)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.patches import Rectangle
+
+# Figures reused by the current worker process
+_figures = {}
+
+
+# ---- Job Descriptions ----
+def mode_job(y, z, intensity, file_name, title="", core=None, xlabel="Y Position (μm)",
+             ylabel="Z Position (μm)", dpi=150):
+    """
+    One mode-profile frame. intensity has shape (len(y), len(z)) and is
+    normalized to its maximum; core = (y0, z0, width, height) outlines the waveguide.
+    """
+    return {"kind": "mode", "y": np.asarray(y), "z": np.asarray(z), "intensity": np.asarray(intensity),
+            "file": file_name, "title": title, "core": core, "xlabel": xlabel, "ylabel": ylabel, "dpi": dpi}
+
+
+def spectrum_job(x, curves, file_name, title="", xlabel="Wavelength (nm)",
+                 ylabel="Normalized Transmission", dpi=150):
+    """One spectrum frame; curves is a list of (values, label) sharing the x axis."""
+    return {"kind": "spectrum", "x": np.asarray(x), "curves": [(np.asarray(v), l) for v, l in curves],
+            "file": file_name, "title": title, "xlabel": xlabel, "ylabel": ylabel, "dpi": dpi}
+
+
+# ---- Frame Drawing (run inside the workers) ----
+def _draw_mode(job):
+    grid = (job["y"].tobytes(), job["z"].tobytes())
+    state = _figures.get("mode")
+    if state is None or state["grid"] != grid:
+        if state is not None:
+            plt.close(state["fig"])
+        fig, ax = plt.subplots(figsize=(8, 6))
+        mesh = ax.pcolormesh(job["y"], job["z"], np.zeros((len(job["z"]), len(job["y"]))),
+                             shading='gouraud', cmap='jet', vmin=0, vmax=1)
+        core = Rectangle((0, 0), 0, 0, linewidth=1.5, edgecolor='w', facecolor='none', linestyle='--')
+        ax.add_patch(core)
+        ax.axis('equal')
+        state = _figures["mode"] = {"grid": grid, "fig": fig, "ax": ax, "mesh": mesh, "core": core}
+
+    intensity = job["intensity"].astype(float)
+    if intensity.max() > 0:
+        intensity = intensity / intensity.max()
+    state["mesh"].set_array(intensity.T)
+    if job["core"] is not None:
+        y0, z0, w, h = job["core"]
+        state["core"].set_bounds(y0, z0, w, h)
+    state["core"].set_visible(job["core"] is not None)
+    state["ax"].set_title(job["title"])
+    state["ax"].set_xlabel(job["xlabel"])
+    state["ax"].set_ylabel(job["ylabel"])
+    state["fig"].savefig(job["file"], dpi=job["dpi"])
+    return job["file"]
+
+
+def _draw_spectrum(job):
+    state = _figures.get("spectrum")
+    if state is None:
+        fig, ax = plt.subplots(figsize=(12, 7))
+        ax.grid(True, which='both', linestyle='--')
+        state = _figures["spectrum"] = {"fig": fig, "ax": ax, "lines": []}
+    ax = state["ax"]
+    lines = state["lines"]
+    while len(lines) < len(job["curves"]):
+        lines.extend(ax.plot([], []))
+    for line, (values, label) in zip(lines, job["curves"]):
+        line.set_data(job["x"], values)
+        line.set_label(label)
+        line.set_visible(True)
+    for line in lines[len(job["curves"]):]:
+        line.set_visible(False)
+        line.set_label("_hidden")
+    ax.relim(visible_only=True)
+    ax.autoscale_view()
+    ax.legend()
+    ax.set_title(job["title"])
+    ax.set_xlabel(job["xlabel"])
+    ax.set_ylabel(job["ylabel"])
+    state["fig"].savefig(job["file"], dpi=job["dpi"])
+    return job["file"]
+
+
+def draw(job):
+    """Renders one job with this process's cached figure; returns the output file name."""
+    folder = os.path.dirname(job["file"])
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    return _draw_mode(job) if job["kind"] == "mode" else _draw_spectrum(job)
+
+
+# ---- Parallel Rendering ----
+def render(jobs, processes=None, chunksize=None):
+    """
+    Renders all jobs in a process pool and returns the written file names in
+    job order. Use processes=0 to render serially in the calling process.
+    """
+    jobs = list(jobs)
+    if processes == 0 or len(jobs) <= 1:
+        return [draw(job) for job in jobs]
+    processes = processes or min(os.cpu_count() or 1, len(jobs))
+    chunksize = chunksize or max(1, len(jobs) // (4 * processes))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(draw, jobs, chunksize=chunksize))
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import time
+
+    # Synthetic Hermite-Gaussian profiles standing in for FDE mode data
+    y = np.linspace(-2, 2, 200)
+    z = np.linspace(-1.5, 1.5, 200)
+    Y, Z = np.meshgrid(y, z, indexing='ij')
+    jobs = []
+    for i in range(100):
+        m, n = i % 4, (i // 4) % 3
+        field = np.polynomial.hermite.hermval(Y/0.4, [0]*m + [1]) * \
+            np.polynomial.hermite.hermval(Z/0.3, [0]*n + [1]) * np.exp(-(Y/0.4)**2/2 - (Z/0.3)**2/2)
+        jobs.append(mode_job(y, z, np.abs(field)**2, f"render_demo/mode_{i:03d}.png",
+                             title=f"Mode {i} Profile", core=(-0.225, -0.11, 0.45, 0.22)))
+    wl = np.linspace(1500, 1600, 500)
+    jobs.append(spectrum_job(wl, [(1 - 0.9/(1 + ((wl - 1545 - g/10)/0.5)**2), f"Gap = {g} nm")
+                                  for g in (50, 60, 70, 100)], "render_demo/spectrum.png"))
+
+    t0 = time.perf_counter()
+    files = render(jobs)
+    print(f"Rendered {len(files)} figures in {time.perf_counter() - t0:.1f} s")
@@ -0,0 +1,212 @@
+"""
+Indexed results catalog for querying past sweeps across all workflows.
+
+Runs used to leave ad hoc files in the working directory
+(ring_resonator_gap_*nm.fsp, ag_position_sweep.csv, simulation.lms, PNGs
+under hard-coded paths), and finding a previous run meant grepping file
+names. This module keeps an embedded SQLite catalog of every run: its
+workflow, parameter values, code version and output artifacts. Parameters
+are stored one row per value with an index on (name, value), so range
+queries stay fast:
+
+    catalog.find("rr_gap", gap=(50e-9, 70e-9), ring_center_radius=3.3e-6)
+"""
+import glob
+import os
+import re
+import sqlite3
+import subprocess
+import time
+
+default_catalog = "results_catalog.sqlite"
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    workflow TEXT NOT NULL,
+    code_version TEXT,
+    created REAL NOT NULL,
+    notes TEXT
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    kind TEXT,
+    size INTEGER,
+    modified REAL
+);
+CREATE INDEX IF NOT EXISTS params_value ON params (name, value);
+CREATE INDEX IF NOT EXISTS params_text ON params (name, text);
+CREATE INDEX IF NOT EXISTS runs_workflow ON runs (workflow);
+CREATE UNIQUE INDEX IF NOT EXISTS artifacts_run_path ON artifacts (run_id, path);
+CREATE INDEX IF NOT EXISTS artifacts_by_path ON artifacts (path);
+"""
+
+
+def code_version(path=None):
+    """Short git commit of the repository containing path, with '+dirty' for local changes."""
+    path = path or os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "-C", path, "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", path, "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("+dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class ResultsCatalog:
+    """SQLite index of runs, their parameters and output files."""
+
+    def __init__(self, db_path=default_catalog):
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(schema)
+        self._version = None
+
+    # ---- Recording ----
+    def add_run(self, workflow, params, artifacts=(), version=None, notes=None):
+        """Indexes one run; artifacts are file paths (or (path, kind) pairs). Returns the run id."""
+        if version is None:
+            self._version = self._version or code_version()
+            version = self._version
+        self.db.execute("BEGIN")
+        try:
+            run_id = self.db.execute(
+                "INSERT INTO runs (workflow, code_version, created, notes) VALUES (?, ?, ?, ?)",
+                (workflow, version, time.time(), notes)).lastrowid
+            for name, value in params.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.db.execute("INSERT INTO params VALUES (?, ?, ?, NULL)", (run_id, name, float(value)))
+                else:
+                    self.db.execute("INSERT INTO params VALUES (?, ?, NULL, ?)", (run_id, name, str(value)))
+            for artifact in artifacts:
+                path, kind = artifact if isinstance(artifact, tuple) else (artifact, None)
+                self._add_artifact(run_id, path, kind)
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return run_id
+
+    def _add_artifact(self, run_id, path, kind=None):
+        path = os.path.abspath(path)
+        kind = kind or os.path.splitext(path)[1].lstrip(".").lower()
+        stat = os.stat(path) if os.path.exists(path) else None
+        self.db.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                        (run_id, path, kind, stat.st_size if stat else None, stat.st_mtime if stat else None))
+
+    # ---- Queries ----
+    def find(self, workflow=None, rel_tol=1e-6, **conditions):
+        """
+        Runs matching every condition. A (low, high) tuple is an inclusive
+        range, a number matches within rel_tol, a string matches exactly.
+        Returns dicts with params and artifacts, newest first.
+        """
+        sql = "SELECT id FROM runs WHERE 1 = 1"
+        args = []
+        if workflow is not None:
+            sql += " AND workflow = ?"
+            args.append(workflow)
+        for name, cond in conditions.items():
+            if isinstance(cond, tuple):
+                lo, hi = cond
+                sql += " AND id IN (SELECT run_id FROM params WHERE name = ? AND value BETWEEN ? AND ?)"
+                args += [name, lo, hi]
+            elif isinstance(cond, str):
+                sql += " AND id IN (SELECT run_id FROM params WHERE name = ? AND text = ?)"
+                args += [name, cond]
+            else:
+                tol = abs(cond) * rel_tol
+                sql += " AND id IN (SELECT run_id FROM params WHERE name = ? AND value BETWEEN ? AND ?)"
+                args += [name, cond - tol, cond + tol]
+        ids = [r[0] for r in self.db.execute(sql + " ORDER BY created DESC, id DESC", args)]
+        return [self.run(i) for i in ids]
+
+    def run(self, run_id):
+        row = dict(self.db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone())
+        row["params"] = {r["name"]: r["value"] if r["value"] is not None else r["text"]
+                         for r in self.db.execute("SELECT * FROM params WHERE run_id = ?", (run_id,))}
+        row["artifacts"] = [dict(r) for r in self.db.execute(
+            "SELECT path, kind, size, modified FROM artifacts WHERE run_id = ?", (run_id,))]
+        return row
+
+    def lookup(self, workflow, kind=None, **params):
+        """Path of an existing artifact from a run with exactly these parameter values, or None."""
+        for run in self.find(workflow, **params):
+            for artifact in run["artifacts"]:
+                if (kind is None or artifact["kind"] == kind) and os.path.exists(artifact["path"]):
+                    return artifact["path"]
+        return None
+
+    # ---- Importing Existing Files ----
+    def index_existing(self, root="."):
+        """
+        Catalogs the files the current scripts leave behind under root:
+        ring_resonator_gap_*nm.fsp (rr_gap), ag_position_sweep.csv (h_sweep),
+        simulation.lms (opa) and ring_resonator_add_drop.fsp. Already indexed
+        files are skipped. Returns the number of new runs.
+        """
+        known = {r[0] for r in self.db.execute("SELECT DISTINCT path FROM artifacts")}
+        count = 0
+        for path in sorted(glob.glob(os.path.join(root, "**", "*.*"), recursive=True)):
+            full = os.path.abspath(path)
+            if full in known:
+                continue
+            name = os.path.basename(path)
+            m = re.fullmatch(r"ring_resonator_gap_(\d+)nm\.fsp", name)
+            if m:
+                self.add_run("rr_gap", {"gap": float(m.group(1)) * 1e-9, "ring_center_radius": 3.3e-6,
+                                        "wg_width": 0.40e-6, "wg_height": 0.22e-6}, [full],
+                             version="unknown", notes="indexed from existing file")
+            elif name == "ring_resonator_add_drop.fsp":
+                self.add_run("rr_add_drop", {"gap": 50e-9, "ring_center_radius": 3.3e-6}, [full],
+                             version="unknown", notes="indexed from existing file")
+            elif name == "ag_position_sweep.csv":
+                self._index_ag_sweep(full)
+            elif name == "simulation.lms":
+                self.add_run("opa", {}, [full], version="unknown", notes="indexed from existing file")
+            else:
+                continue
+            count += 1
+        return count
+
+    def _index_ag_sweep(self, path):
+        # One catalog run per sweep point; all share the CSV as their artifact
+        self.db.execute("BEGIN")
+        try:
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    ag1, ag2, gap, neff, frac = map(float, line.split(","))
+                    run_id = self.db.execute(
+                        "INSERT INTO runs (workflow, code_version, created, notes) VALUES (?, ?, ?, ?)",
+                        ("h_sweep", "unknown", time.time(), "indexed from existing file")).lastrowid
+                    for name, value in (("ag1_y", ag1*1e-6), ("ag2_y", ag2*1e-6), ("gap_width", gap*1e-6),
+                                        ("neff", neff), ("intensity_percent", frac)):
+                        self.db.execute("INSERT INTO params VALUES (?, ?, ?, NULL)", (run_id, name, value))
+                    self._add_artifact(run_id, path, "csv")
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import sys
+
+    catalog = ResultsCatalog(sys.argv[1] if len(sys.argv) > 1 else default_catalog)
+    print(f"Indexed {catalog.index_existing('.')} existing result files")
+    for run in catalog.find("rr_gap", gap=(50e-9, 70e-9), ring_center_radius=3.3e-6):
+        gap_nm = run["params"]["gap"] * 1e9
+        print(f"  run {run['id']}: gap = {gap_nm:.0f} nm -> {[a['path'] for a in run['artifacts']]}")
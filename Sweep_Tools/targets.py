@@ -0,0 +1,203 @@
+"""
+Per-point job targets for the sweep scripts in this repository.
+
+rr_gap, h_sweep.py, opa.py, ball_lens_sweep.py and ball_achromat.py run their
+whole sweep (and open their plots) at import time, so they cannot be queued
+directly. Each function here runs one point of one of those sweeps with the
+same geometry and post-processing, in its own solver session, and returns a
+JSON-serialisable result; a "params" entry in the result holds the full
+effective parameter set that the scheduler records. They are meant to be queued through job_queue:
+
+    queue.submit_sweep("rr_gap", "targets:rr_gap_point",
+                       [{"gap": g} for g in (50e-9, 60e-9, 70e-9, 100e-9)])
+
+A failure to open the solver session (typically no free license seat) is
+raised as TransientError, so the scheduler re-queues the job.
+"""
+import os
+import sys
+
+import numpy as np
+
+# --- MODIFY THIS LINE IF YOUR LUMERICAL INSTALLATION IS DIFFERENT ---
+lumapi_path = r"C:\Program Files\Lumerical\v241\api\python"
+
+here = os.path.dirname(os.path.abspath(__file__))
+repo = os.path.dirname(here)
+
+
+class TransientError(Exception):
+    """Solver session could not be opened; matched by name in job_queue.run_job."""
+
+
+def _lumapi():
+    if lumapi_path not in sys.path:
+        sys.path.append(lumapi_path)
+    import lumapi
+    return lumapi
+
+
+def _session(factory, **kwargs):
+    try:
+        return factory(**kwargs)
+    except Exception as e:
+        raise TransientError(f"Could not start solver session: {e}")
+
+
+# ---- Ring_Resonator/Ring_Resonator_Coupling_Gap_Sweep/rr_gap ----
+def rr_gap_file(gap, ring_center_radius=3.3e-6, wg_width=0.40e-6, wg_height=0.22e-6):
+    """
+    Cached .fsp name for one geometry. The rr_gap geometry keeps the script's
+    name (ring_resonator_gap_<gap>nm.fsp); any other geometry gets every
+    parameter in its name, so a cached file is never reused for another ring.
+    """
+    name = f"ring_resonator_gap_{gap*1e9:.0f}nm"
+    if not np.allclose([ring_center_radius, wg_width, wg_height], [3.3e-6, 0.40e-6, 0.22e-6], rtol=1e-9, atol=0):
+        name += f"_R{ring_center_radius*1e9:.0f}nm_w{wg_width*1e9:.0f}nm_h{wg_height*1e9:.0f}nm"
+    return name + ".fsp"
+
+
+def rr_gap_point(gap, out_dir=".", ring_center_radius=3.3e-6, wg_width=0.40e-6, wg_height=0.22e-6):
+    """One coupling gap of rr_gap: builds (or reuses) the .fsp, runs it and returns T_raw / T_input."""
+    lumapi = _lumapi()
+    ring_width = wg_width
+    file_name = os.path.join(out_dir, rr_gap_file(gap, ring_center_radius, wg_width, wg_height))
+    with _session(lumapi.FDTD, hide=True) as fdtd:
+        if os.path.exists(file_name):
+            fdtd.load(file_name)
+        else:
+            ring_inner_radius = ring_center_radius - ring_width/2
+            ring_outer_radius = ring_center_radius + ring_width/2
+            wg_center_y = ring_outer_radius + gap + wg_width/2
+            z_center_si = wg_height/2
+            fdtd.addrect(name="clad", material="SiO2 (Glass) - Palik", x=0, y=0, z_min=-3e-6, z_max=0,
+                         x_span=12e-6, y_span=12e-6)
+            fdtd.addring(name="ring", material="Si (Silicon) - Palik", x=0, y=0, z=z_center_si,
+                         inner_radius=ring_inner_radius, outer_radius=ring_outer_radius, z_span=wg_height)
+            fdtd.addrect(name="waveguide", material="Si (Silicon) - Palik", x=0, y=wg_center_y,
+                         z=z_center_si, x_span=12e-6, y_span=wg_width, z_span=wg_height)
+            fdtd.addfdtd(dimension="3D", x_min=-5.5e-6, x_max=5.5e-6, y_min=-5.25e-6, y_max=5.75e-6,
+                         z_min=-1e-6, z_max=1e-6, simulation_time=4000e-15)
+            fdtd.setglobalmonitor("frequency points", 500)
+            fdtd.addmode(name="source", injection_axis="x-axis", direction="Forward",
+                         x=-5.5e-6, y=wg_center_y, z=z_center_si,
+                         y_span=wg_width*3, z_span=wg_height*4,
+                         wavelength_start=1.5e-6, wavelength_stop=1.6e-6)
+            fdtd.updatesourcemode()
+            fdtd.set("mode selection", "fundamental mode")
+            fdtd.addpower(name="input_power", monitor_type="2D X-normal", x=-5.4e-6,
+                          y=wg_center_y, z=z_center_si, y_span=wg_width*3, z_span=wg_height*4)
+            fdtd.addpower(name="transmission", monitor_type="2D X-normal", x=5.5e-6,
+                          y=wg_center_y, z=z_center_si, y_span=wg_width*3, z_span=wg_height*4)
+            fdtd.save(file_name)
+            fdtd.run()
+        transmission = fdtd.getresult("transmission", "T")
+        T_raw = np.abs(transmission["T"]).ravel()
+        T_input = np.abs(fdtd.getresult("input_power", "T")["T"]).ravel()
+    # Full effective parameter set, recorded by the scheduler for the cost model
+    params = {"gap": gap, "ring_center_radius": ring_center_radius, "wg_width": wg_width,
+              "wg_height": wg_height, "x_span": 11e-6, "y_span": 11e-6, "z_span": 2e-6,
+              "simulation_time": 4000e-15, "num_freq_points": 500, "mesh_accuracy": 2,
+              "wl_start": 1.5e-6, "wl_stop": 1.6e-6, "n_max": 3.48}
+    return {"wavelengths": transmission["lambda"].ravel().tolist(),
+            "T_normalized": (T_raw / T_input).tolist(),
+            "params": params,
+            "artifacts": [os.path.abspath(file_name)]}
+
+
+# ---- Waveguide_main/waveguide/h_sweep.py ----
+def h_sweep_point(ag1_y, ag2_y, lms_file):
+    """One Ag position pair of h_sweep: gap width (um), neff and E-field intensity in the gap (%)."""
+    lumapi = _lumapi()
+    with _session(lumapi.MODE, hide=True) as mode:
+        mode.load(lms_file)
+        mode.switchtolayout()
+        mode.setnamed("Ag1", "y", ag1_y)
+        mode.setnamed("Ag2", "y", ag2_y)
+        wg_y_min = mode.getnamed("waveguide", "y min")
+        wg_z_min = mode.getnamed("waveguide", "z min")
+        wg_z_max = mode.getnamed("waveguide", "z max")
+        ag1_y_max = mode.getnamed("Ag1", "y max")
+
+        num_found = mode.findmodes()
+        best_idx, best_neff = 1, 0
+        for m in range(1, min(5, int(num_found)) + 1):
+            neff_val = np.real(mode.getdata(f"mode{m}", "neff")).item()
+            if 1.5 < neff_val < 3.2 and neff_val > best_neff:
+                best_idx, best_neff = m, neff_val
+        mode_name = f"mode{best_idx}"
+        neff = np.real(mode.getdata(mode_name, "neff")).item()
+        E_int = sum(np.abs(np.squeeze(mode.getdata(mode_name, comp)))**2 for comp in ("Ex", "Ey", "Ez"))
+        y_m = mode.getdata(mode_name, "y").flatten()
+        z_m = mode.getdata(mode_name, "z").flatten()
+
+    Y, Z = np.meshgrid(y_m, z_m, indexing='ij')
+    mask = (Y >= ag1_y_max) & (Y <= wg_y_min) & (Z >= wg_z_min) & (Z <= wg_z_max)
+    total = np.sum(E_int)
+    return {"gap_width": (wg_y_min - ag1_y_max)*1e6, "neff": neff,
+            "intensity_percent": float(np.sum(E_int*mask)/total*100) if total > 0 else 0.0}
+
+
+# ---- Waveguide_main/SOI _Grating _&_ Waveguide_Simulation/opa.py ----
+def opa_point(width, thickness, wavelength=1.55e-6, lms_file="simulation.lms", n_modes=4):
+    """neff of the first n_modes of the opa.py waveguide (simulation.lms from setup_fde) at one point."""
+    sys.path.append(os.path.join(repo, "Waveguide_main", "SOI _Grating _&_ Waveguide_Simulation"))
+    from neff_surrogate import fde_solver
+
+    lumapi = _lumapi()
+    with _session(lumapi.MODE, hide=True) as mode:
+        mode.load(lms_file)
+        neff = fde_solver(mode, n_modes)(width, thickness, wavelength)
+    return {"neff": neff.tolist(),
+            "params": {"width": width, "thickness": thickness, "wavelength": wavelength,
+                       "lms_file": os.path.abspath(lms_file), "n_modes": n_modes}}
+
+
+# ---- Zemax_Opticstudio/Sunlight_to_fiber_coupling ----
+def _gia_efficiency(zos_file, text_file, update):
+    import zospy as zp
+    sys.path.append(os.path.join(repo, "Zemax_Opticstudio", "Sunlight_to_fiber_coupling"))
+    from mce_sweep import parse_efficiency
+
+    zos = zp.ZOS()
+    try:
+        oss = zos.connect()
+    except Exception as e:
+        raise TransientError(f"Could not connect to OpticStudio: {e}")
+    try:
+        oss.load(zos_file, saveifneeded=False)
+        update(oss)
+        gia = oss.Analyses.New_Analysis(zp.constants.Analysis.AnalysisIDM.GeometricImageAnalysis)
+        try:
+            gia.ApplyAndWaitForCompletion()
+            efficiency = parse_efficiency(text_file) if gia.GetResults().GetTextFile(text_file) else None
+        finally:
+            gia.Close()
+            if os.path.exists(text_file):
+                os.remove(text_file)
+    finally:
+        # The loaded file is never saved, so the original system is left untouched
+        zos.disconnect()
+    return {"efficiency": efficiency}
+
+
+def ball_lens_point(radius, distance, zos_file, text_file):
+    """GIA efficiency (%) of ball_lens_sweep.py at one ball radius and working distance (mm)."""
+    def update(oss):
+        surface_1 = oss.LDE.GetSurfaceAt(1)
+        surface_2 = oss.LDE.GetSurfaceAt(2)
+        surface_1.Radius = float(radius)
+        surface_1.Thickness = float(2*radius)
+        surface_1.SemiDiameter = float(radius)
+        surface_2.Radius = float(-radius)
+        surface_2.SemiDiameter = float(radius)
+        surface_2.Thickness = float(distance)
+        oss.SystemData.Aperture.ApertureValue = float(radius)
+    return _gia_efficiency(zos_file, os.path.splitext(text_file)[0] + f"_{os.getpid()}.txt", update)
+
+
+def ball_achromat_point(distance, zos_file, text_file):
+    """GIA efficiency (%) of ball_achromat.py at one ball-to-doublet distance (mm)."""
+    def update(oss):
+        oss.LDE.GetSurfaceAt(2).Thickness = float(distance)
+    return _gia_efficiency(zos_file, os.path.splitext(text_file)[0] + f"_{os.getpid()}.txt", update)
@@ -0,0 +1,246 @@
+"""
+Vectorized Monte Carlo fabrication-tolerance analysis.
+
+Correlated process variations (gap, width, height, Ag position, ...) are drawn
+in one batch and evaluated through fast local models instead of solver jobs:
+
+* ring_model: analytic all-pass ring transfer function of the rr_gap ring,
+  with neff(width, height, wavelength) taken from an interpolated table
+  (e.g. neff_surrogate.NeffTable) and an exponential gap-coupling law;
+* table_model: 1D interpolation of stored sweep results, e.g. neff and gap
+  confinement vs slot gap width from h_sweep's ag_position_sweep.csv.
+
+The analysis reports yield against a spec and ranks the parameters by
+sensitivity. It also picks a few corner cases to confirm with the full solver
+(for instance by submitting them through job_queue).
+"""
+import numpy as np
+
+
+# ---- Process Variations ----
+def draw_variations(nominal, sigma, corr=None, n=100000, seed=None):
+    """
+    Correlated Gaussian samples around nominal. nominal and sigma are dicts
+    with the same keys; corr is a dict {(a, b): rho} of pairwise correlations.
+    Returns a dict of arrays of length n.
+    """
+    names = list(nominal)
+    C = np.eye(len(names))
+    for (a, b), rho in (corr or {}).items():
+        i, j = names.index(a), names.index(b)
+        C[i, j] = C[j, i] = rho
+    s = np.array([sigma.get(k, 0.0) for k in names])
+    L = np.linalg.cholesky(C)
+    z = np.random.default_rng(seed).standard_normal((n, len(names))) @ L.T
+    return {k: nominal[k] + s[i]*z[:, i] for i, k in enumerate(names)}
+
+
+# ---- Local Models ----
+def coupling_from_gap(gap, kappa2_ref=0.04, gap_ref=50e-9, decay=40e-9):
+    """Power coupling of the bus-ring coupler, kappa^2 = kappa2_ref * exp(-(gap - gap_ref)/decay)."""
+    return np.clip(kappa2_ref * np.exp(-(np.asarray(gap) - gap_ref)/decay), 0, 1)
+
+
+def fit_coupling(gaps, kappa2):
+    """Calibrates (kappa2_ref, gap_ref, decay) of coupling_from_gap from coupler results (e.g. rr_gap)."""
+    slope, intercept = np.polyfit(np.asarray(gaps), np.log(kappa2), 1)
+    gap_ref = float(np.mean(gaps))
+    return {"kappa2_ref": float(np.exp(intercept + slope*gap_ref)), "gap_ref": gap_ref, "decay": -1/slope}
+
+
+def ring_model(neff_model, radius=3.3e-6, width=0.40e-6, height=0.22e-6, target_wavelength=1.55e-6,
+               loss_db_cm=3.0, coupling=None, order=None):
+    """
+    Returns evaluate(samples) for the rr_gap all-pass ring. samples needs
+    "gap", "width" and "height" (and optionally "radius"); neff_model(width,
+    height, wavelength) returns neff with a trailing mode axis (mode 0 used).
+    Metrics: wavelength of the tracked resonance, extinction ratio (dB),
+    loaded Q and FSR.
+
+    The longitudinal order is fixed for all samples: by default the order of
+    the nominal design (radius, width, height) nearest target_wavelength, so
+    a perturbed ring reports the shift of that same resonance rather than a
+    jump to its neighbour.
+
+    Samples the table cannot evaluate (width, height or a Newton step in
+    wavelength outside the NeffTable range) get NaN metrics instead of
+    failing the whole batch.
+    """
+    coupling = coupling or {}
+    axes = getattr(neff_model, "axes", None)
+
+    def neff(w, h, wl, valid):
+        cols = [np.array(c, dtype=float) for c in np.broadcast_arrays(w, h, wl)]
+        if axes is not None:
+            # Clip into the table so the batch never raises; clipped samples are masked
+            for c, x in zip(cols, axes):
+                lo, hi = x[0], x[-1]
+                tol = 1e-9*max(abs(lo), abs(hi))
+                valid &= (c >= lo - tol) & (c <= hi + tol)
+                np.clip(c, lo, hi, out=c)
+            n = np.asarray(neff_model(*cols))[..., 0]
+        else:
+            try:
+                n = np.asarray(neff_model(*cols))[..., 0]
+            except ValueError:
+                # Model without known bounds: find the failing samples one by one
+                n = np.full(cols[0].shape, np.nan)
+                for i in np.ndindex(n.shape):
+                    try:
+                        n[i] = np.asarray(neff_model(*(c[i] for c in cols)))[..., 0]
+                    except ValueError:
+                        pass
+        valid &= np.isfinite(n)
+        return n
+
+    if order is None:
+        n0 = np.asarray(neff_model(width, height, target_wavelength))[..., 0]
+        order = np.round(n0*2*np.pi*radius/target_wavelength)
+
+    def evaluate(samples):
+        w, h = samples["width"], samples["height"]
+        R = samples.get("radius", radius)
+        L = 2*np.pi*R
+        valid = np.ones(np.broadcast(w, h, R).shape, dtype=bool)
+        wl = np.full(valid.shape, target_wavelength, dtype=float)
+        dl = 1e-10
+        m = order
+        # Fixed-point iteration on lambda = neff(lambda) * L / m using the group index
+        for _ in range(6):
+            n = neff(w, h, wl, valid)
+            ng = n - wl*(neff(w, h, wl + dl, valid) - neff(w, h, wl - dl, valid))/(2*dl)
+            # Masked samples stay at the target so they cannot drift further out
+            wl = np.where(valid, wl + (n*L/m - wl)*n/ng, target_wavelength)
+        n = neff(w, h, wl, valid)
+        ng = n - wl*(neff(w, h, wl + dl, valid) - neff(w, h, wl - dl, valid))/(2*dl)
+
+        k2 = coupling_from_gap(samples["gap"], **coupling)
+        r = np.sqrt(1 - k2)
+        a = 10**(-loss_db_cm*100*L/20)
+        t_min = (a - r)**2/(1 - a*r)**2
+        metrics = {
+            "resonance": wl,
+            "extinction_db": -10*np.log10(np.maximum(t_min, 1e-12)),
+            "Q": np.pi*ng*L*np.sqrt(r*a)/(wl*(1 - r*a)),
+            "fsr": wl**2/(ng*L),
+        }
+        return {k: np.where(valid, v, np.nan) for k, v in metrics.items()}
+    return evaluate
+
+
+def table_model(x, columns, param):
+    """
+    Returns evaluate(samples) interpolating stored 1D sweep results: x are the
+    swept values of samples[param] and columns maps metric names to arrays.
+    """
+    order = np.argsort(x)
+    x = np.asarray(x, dtype=float)[order]
+    columns = {k: np.asarray(v, dtype=float)[order] for k, v in columns.items()}
+
+    def evaluate(samples):
+        p = np.asarray(samples[param])
+        return {k: np.interp(p, x, v) for k, v in columns.items()}
+    return evaluate
+
+
+def ag_sweep_model(csv_file="ag_position_sweep.csv"):
+    """
+    table_model over h_sweep's CSV: neff and gap intensity (%) vs the slot gap
+    width (m), sampled as "gap_width". h_sweep moves Ag1 and Ag2 in opposite
+    directions, so each gap width comes with the Ag2 position of that sweep
+    point; the model covers this joint displacement, not independent jitter
+    of either Ag block.
+    """
+    data = np.loadtxt(csv_file, delimiter=",", skiprows=1, ndmin=2)
+    return table_model(data[:, 2]*1e-6, {"neff": data[:, 3], "intensity": data[:, 4]}, "gap_width")
+
+
+# ---- Analysis ----
+def tolerance_analysis(evaluate, samples, spec):
+    """
+    Yield and sensitivity ranking. spec maps metric names to (low, high)
+    limits (None for open ends). Sensitivities are standardized regression
+    coefficients of each metric on the varied parameters. Samples with a NaN
+    metric (outside the model's range) count as failures and are left out of
+    the sensitivities; "out_of_range" is their number.
+    """
+    metrics = evaluate(samples)
+    n = len(next(iter(samples.values())))
+    evaluated = np.ones(n, dtype=bool)
+    for name in spec:
+        evaluated &= np.isfinite(metrics[name])
+    passed = evaluated.copy()
+    for name, (lo, hi) in spec.items():
+        if lo is not None:
+            passed &= metrics[name] >= lo
+        if hi is not None:
+            passed &= metrics[name] <= hi
+
+    varied = [k for k, v in samples.items() if np.ndim(v) and np.std(v[evaluated]) > 0]
+    X = np.column_stack([(samples[k][evaluated] - np.mean(samples[k][evaluated]))/np.std(samples[k][evaluated])
+                         for k in varied])
+    sensitivity = {}
+    for name in spec:
+        y = metrics[name][evaluated]
+        coef = np.linalg.lstsq(X, (y - y.mean())/max(y.std(), 1e-300), rcond=None)[0]
+        sensitivity[name] = sorted(zip(varied, coef), key=lambda t: -abs(t[1]))
+    return {"yield": passed.mean(), "passed": passed, "metrics": metrics, "sensitivity": sensitivity,
+            "out_of_range": int(n - evaluated.sum())}
+
+
+def corner_cases(samples, result, spec, k=5):
+    """
+    Failing samples closest to the spec limits plus the worst violators: the
+    few points worth confirming with the full solver (out-of-range samples
+    are skipped). Returns parameter dicts.
+    """
+    margin = np.full(len(result["passed"]), np.inf)
+    for name, (lo, hi) in spec.items():
+        y = result["metrics"][name]
+        scale = np.nanstd(y) or 1.0
+        if lo is not None:
+            margin = np.minimum(margin, (y - lo)/scale)
+        if hi is not None:
+            margin = np.minimum(margin, (hi - y)/scale)
+    failing = np.nonzero(margin < 0)[0]
+    picks = list(failing[np.argsort(-margin[failing])][:k]) + list(np.argsort(margin)[:k])
+    picks = list(dict.fromkeys(int(i) for i in picks))
+    return [{key: float(v[i]) for key, v in samples.items()} for i in picks]
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import os
+    import sys
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                                 "Waveguide_main", "SOI _Grating _&_ Waveguide_Simulation"))
+    from neff_surrogate import NeffTable, build_table
+
+    if os.path.exists("ring_neff_table.npz"):
+        table = NeffTable.load("ring_neff_table.npz")
+    else:
+        # Analytic stand-in for an FDE-built table of the 400 x 220 nm strip waveguide
+        def stand_in(w, h, wl):
+            v = np.pi*np.sqrt(w*h)/wl*np.sqrt(3.48**2 - 1.44**2)
+            n = 1.44 + (3.48 - 1.44)*(1 - 1/(0.6*v + 0.5)**2)
+            return np.array([n - 0.25*(wl - 1.55e-6)/0.1e-6])
+        table = build_table(stand_in, np.linspace(0.36e-6, 0.44e-6, 9),
+                            np.linspace(0.20e-6, 0.24e-6, 5), np.linspace(1.50e-6, 1.60e-6, 11))
+
+    nominal = {"gap": 50e-9, "width": 0.40e-6, "height": 0.22e-6}
+    sigma = {"gap": 5e-9, "width": 5e-9, "height": 2e-9}
+    # Over-etching widens the gap and narrows the waveguides together
+    samples = draw_variations(nominal, sigma, {("gap", "width"): -0.8}, n=200000, seed=0)
+    evaluate = ring_model(table)
+    target = evaluate({k: np.array([v]) for k, v in nominal.items()})["resonance"][0]
+    spec = {"resonance": (target - 2e-9, target + 2e-9), "Q": (5000, None)}
+    result = tolerance_analysis(evaluate, samples, spec)
+
+    print(f"Nominal resonance {target*1e9:.2f} nm, yield = {result['yield']*100:.1f} % "
+          f"({result['out_of_range']} samples outside the neff table)")
+    for metric, ranking in result["sensitivity"].items():
+        print(f"  {metric}: " + ", ".join(f"{k} ({s:+.2f})" for k, s in ranking))
+    print("Corner cases for full-solver confirmation:")
+    for p in corner_cases(samples, result, spec, k=3):
+        print("  " + ", ".join(f"{k} = {v*1e9:.1f} nm" for k, v in p.items()))
@@ -0,0 +1,311 @@
+"""
+Bloch unit-cell analysis of the SOI oxide grating used in opa.py.
+
+Instead of building all N teeth, a single period of length l_g (duty cycle dc,
+etch depth t_g) is characterised once, either from the effective indices of
+its two cross-sections (transfer-matrix model) or from the S-matrix of one
+period solved with EME. The cell transfer matrix is then raised to the N-th
+power analytically, so the Bloch decay constant, emission angle and the
+response of a grating of any length cost O(1) to evaluate.
+"""
+import numpy as np
+
+# ---- Device Parameters (same as opa.py) ----
+thick_Clad = 0.48e-6
+thick_Si = 0.12e-6
+thick_BOX = 2.0e-6
+width_Si = 0.8e-6
+N = 78
+l_g = 0.64e-6
+dc = 0.6
+t_r = 0.08e-6
+t_g = thick_Clad - t_r
+wavelength = 1.55e-6
+n_clad = 1.45
+
+material_Clad = "SiO2 (Glass) - Palik"
+material_BOX = "SiO2 (Glass) - Palik"
+material_Si = "Si (Silicon) - Palik"
+
+width_margin = 2.0e-6
+Y_span = 2*width_margin + width_Si
+
+
+# ---- Cross-Section Effective Indices (2 FDE solves, independent of N) ----
+def cross_section(sim, etched, x_span=1e-6):
+    """Builds a uniform slice of the grating (tooth or etched gap) and returns the fundamental neff."""
+    sim.switchtolayout()
+    sim.deleteall()
+    clad_top = thick_Si + t_r if etched else thick_Si + thick_Clad
+    for name, material, z_min, z_max, y_span in [
+        ("clad", material_Clad, 0, clad_top, Y_span + 1e-6),
+        ("BOX", material_BOX, -thick_BOX, 0, Y_span + 1e-6),
+        ("Wafer", material_Si, -thick_BOX - 2e-6, -thick_BOX, Y_span + 1e-6),
+        ("waveguide", material_Si, 0, thick_Si, width_Si),
+    ]:
+        sim.addrect()
+        sim.set("name", name)
+        sim.set("material", material)
+        sim.set("x", 0)
+        sim.set("x span", x_span)
+        sim.set("y", 0)
+        sim.set("y span", y_span)
+        sim.set("z min", z_min)
+        sim.set("z max", z_max)
+        if name == "clad":
+            sim.set("override mesh order from material database", 1)
+            sim.set("mesh order", 2)
+    sim.addfde()
+    sim.set("solver type", "2D X normal")
+    sim.set("x", 0)
+    sim.set("y", 0)
+    sim.set("y span", 3e-6)
+    sim.set("z", thick_Si/2)
+    sim.set("z span", 4e-6)
+    sim.set("wavelength", wavelength)
+    sim.set("define y mesh by", 1)
+    sim.set("define z mesh by", 1)
+    sim.set("dy", 0.02e-6)
+    sim.set("dz", 0.02e-6)
+    sim.findmodes()
+    return complex(np.squeeze(sim.getdata("FDE::data::mode1", "neff")))
+
+
+def section_indices(sim):
+    """Returns (neff_tooth, neff_gap) of the unetched and etched grating cross-sections."""
+    return cross_section(sim, etched=False), cross_section(sim, etched=True)
+
+
+# ---- One-Period S-Matrix with EME (radiation included) ----
+def cell_smatrix(sim, period=l_g, duty_cycle=dc, modes=10):
+    """
+    Builds a single grating period, referenced symmetrically as half tooth |
+    etched gap | half tooth, and propagates it with EME. Both ports sit in the
+    tooth, so cascaded cells include both interfaces of every period.
+    Returns the 2x2 fundamental-mode S-matrix; radiation shows up as |S| < 1.
+    """
+    sim.switchtolayout()
+    sim.deleteall()
+    half_tooth = period * duty_cycle / 2
+    x_gap = period * (1 - duty_cycle)
+    for name, material, z_min, z_max, y_span in [
+        ("clad", material_Clad, 0, thick_Si + thick_Clad, Y_span + 1e-6),
+        ("BOX", material_BOX, -thick_BOX, 0, Y_span + 1e-6),
+        ("Wafer", material_Si, -thick_BOX - 2e-6, -thick_BOX, Y_span + 1e-6),
+        ("waveguide", material_Si, 0, thick_Si, width_Si),
+    ]:
+        sim.addrect()
+        sim.set("name", name)
+        sim.set("material", material)
+        sim.set("x min", -1e-6)
+        sim.set("x max", period + 1e-6)
+        sim.set("y", 0)
+        sim.set("y span", y_span)
+        sim.set("z min", z_min)
+        sim.set("z max", z_max)
+        if name == "clad":
+            sim.set("override mesh order from material database", 1)
+            sim.set("mesh order", 2)
+    sim.addrect()
+    sim.set("name", "grating_gap")
+    sim.set("material", "etch")
+    sim.set("x min", half_tooth)
+    sim.set("x max", half_tooth + x_gap)
+    sim.set("y", 0)
+    sim.set("y span", Y_span + 1e-6)
+    sim.set("z min", thick_Si + t_r)
+    sim.set("z max", thick_Si + t_r + t_g)
+
+    sim.addeme()
+    sim.set("wavelength", wavelength)
+    sim.set("x min", 0)
+    sim.set("y", 0)
+    sim.set("y span", 3e-6)
+    sim.set("z", thick_Si/2)
+    sim.set("z span", 4e-6)
+    sim.set("number of cell groups", 3)
+    sim.set("group spans", np.array([[half_tooth], [x_gap], [half_tooth]]))
+    sim.set("cells", np.array([[1], [1], [1]]))
+    sim.set("subcell method", np.array([[0], [0], [0]]))
+    sim.set("number of modes for all cell groups", modes)
+    sim.set("y min bc", "PML")
+    sim.set("y max bc", "PML")
+    sim.set("z min bc", "PML")
+    sim.set("z max bc", "PML")
+    sim.run()
+    sim.emepropagate()
+    S = sim.getresult("EME", "user s matrix")
+    return np.asarray(S)[:2, :2]
+
+
+# ---- Transfer Matrices ----
+# Matrices are stored as (m11, m12, m21, m22) tuples of arrays so that every
+# routine below broadcasts over period / duty-cycle / wavelength grids.
+def _matmul(a, b):
+    return (a[0]*b[0] + a[1]*b[2], a[0]*b[1] + a[1]*b[3],
+            a[2]*b[0] + a[3]*b[2], a[2]*b[1] + a[3]*b[3])
+
+
+def _interface(n_a, n_b):
+    return ((n_b + n_a)/(2*n_b), (n_b - n_a)/(2*n_b),
+            (n_b - n_a)/(2*n_b), (n_b + n_a)/(2*n_b))
+
+
+def _propagate(n, length, wl):
+    phase = 2*np.pi/wl * n * length
+    zero = np.zeros_like(phase)
+    return (np.exp(1j*phase), zero, zero, np.exp(-1j*phase))
+
+
+def cell_matrix(neff_tooth, neff_gap, period=l_g, duty_cycle=dc, wl=wavelength):
+    """Transfer matrix of one period (half tooth | etched gap | half tooth), same reference as cell_smatrix."""
+    neff_tooth = np.asarray(neff_tooth, dtype=complex)
+    neff_gap = np.asarray(neff_gap, dtype=complex)
+    half_tooth = _propagate(neff_tooth, period*duty_cycle/2, wl)
+    M = _matmul(_interface(neff_tooth, neff_gap), half_tooth)
+    M = _matmul(_propagate(neff_gap, period*(1 - duty_cycle), wl), M)
+    M = _matmul(_interface(neff_gap, neff_tooth), M)
+    return _matmul(half_tooth, M)
+
+
+def smatrix_to_tmatrix(S):
+    """Converts a 2-port S-matrix [[S11, S12], [S21, S22]] into the transfer-matrix convention above."""
+    S = np.asarray(S, dtype=complex)
+    S11, S12, S21, S22 = S[..., 0, 0], S[..., 0, 1], S[..., 1, 0], S[..., 1, 1]
+    return ((S21*S12 - S11*S22)/S12, S22/S12, -S11/S12, 1/S12)
+
+
+# ---- Bloch Analysis ----
+def bloch_wavenumber(M, period=l_g, neff_ref=None, wl=wavelength):
+    """
+    Complex Bloch wavenumber K of the forward mode, from cos(K*period) = tr(M)/2.
+    When neff_ref is given, both branches +-K0 of the arccos are unfolded and
+    the one whose Re(K) lies closest to beta = 2*pi*neff_ref/wl is kept;
+    inside a stopband (equal distance) the decaying branch Im(K) >= 0 wins.
+    """
+    K0 = np.arccos((M[0] + M[3])/2 + 0j) / period
+    if neff_ref is None:
+        # Forward mode decays along +x
+        return np.where(K0.imag < 0, -K0, K0)
+    G = 2*np.pi/period
+    beta = 2*np.pi/wl*np.real(neff_ref)
+    K1 = K0 + np.round((beta - K0.real)/G)*G
+    K2 = -K0 + np.round((beta + K0.real)/G)*G
+    d1, d2 = np.abs(K1.real - beta), np.abs(K2.real - beta)
+    tie = np.abs(d1 - d2) <= 1e-9*G
+    return np.where(tie, np.where(K1.imag >= 0, K1, K2), np.where(d1 < d2, K1, K2))
+
+
+def decay_constant(K):
+    """
+    Field decay constant alpha = Im(K) in 1/m; the guided power falls as
+    exp(-2*alpha*x). This is radiation decay only when M comes from an EME
+    cell; with real cross-section indices it is the Bragg (stopband) decay.
+    """
+    return np.imag(K)
+
+
+def emission_angle(K, period=l_g, order=-1, wl=wavelength, n_top=n_clad):
+    """Emission angle (degrees from the surface normal) of the given diffraction order into n_top."""
+    s = (np.real(K) + order*2*np.pi/period) / (2*np.pi/wl * n_top)
+    return np.degrees(np.arcsin(np.clip(s, -1, 1)))
+
+
+def grating_response(M, n_periods=N):
+    """
+    Transmission/reflection amplitudes of n_periods cascaded cells, using the
+    Chebyshev identity M^N = U_{N-1}(x) M - U_{N-2}(x) I with x = tr(M)/2.
+    """
+    x = (M[0] + M[3])/2 + 0j
+    phi = np.arccos(x)
+    sin_phi = np.sin(phi)
+    small = np.abs(sin_phi) < 1e-12
+    sin_phi = np.where(small, 1, sin_phi)
+    u1 = np.where(small, n_periods, np.sin(n_periods*phi)/sin_phi)
+    u2 = np.where(small, n_periods - 1, np.sin((n_periods - 1)*phi)/sin_phi)
+    MN = (u1*M[0] - u2, u1*M[1], u1*M[2], u1*M[3] - u2)
+    t = 1/MN[3]
+    r = -MN[2]/MN[3]
+    return t, r
+
+
+def emitted_fraction(M, n_periods=N):
+    """Fraction of the input power not transmitted or reflected (radiated + absorbed)."""
+    t, r = grating_response(M, n_periods)
+    return 1 - np.abs(t)**2 - np.abs(r)**2
+
+
+# ---- Period / Duty-Cycle Sweep ----
+def _sweep_results(M, P, D, neff_tooth, neff_gap, n_periods, wl):
+    neff_avg = D*np.real(neff_tooth) + (1 - D)*np.real(neff_gap)
+    K = bloch_wavenumber(M, P, neff_avg, wl)
+    t, _ = grating_response(M, n_periods)
+    return {
+        "period": P,
+        "duty_cycle": D,
+        "K": K,
+        "alpha": decay_constant(K),
+        "angle": emission_angle(K, P, wl=wl),
+        "T": np.abs(t)**2,
+    }
+
+
+def sweep_cell(neff_tooth, neff_gap, periods, duty_cycles, n_periods=N, wl=wavelength):
+    """
+    Evaluates the Bloch wavenumber, emission angle and full-length transmission
+    on a period x duty-cycle grid from the two cross-section indices.
+
+    The FDE indices are real, so this model has no radiation: "alpha" and "T"
+    only describe Bragg reflection and alpha is zero outside the stopband. Use
+    sweep_cell_eme for the radiation decay.
+    """
+    P, D = np.meshgrid(np.asarray(periods), np.asarray(duty_cycles), indexing='ij')
+    M = cell_matrix(neff_tooth, neff_gap, P, D, wl)
+    return _sweep_results(M, P, D, neff_tooth, neff_gap, n_periods, wl)
+
+
+def sweep_cell_eme(sim, neff_tooth, neff_gap, periods, duty_cycles, n_periods=N, modes=10):
+    """
+    Same grid as sweep_cell, but every cell is an EME period (one EME run per
+    grid point), so "alpha" and "T" include radiation into the cladding and
+    substrate. neff_tooth/neff_gap are only used to pick the Bloch branch.
+    """
+    P, D = np.meshgrid(np.asarray(periods), np.asarray(duty_cycles), indexing='ij')
+    S = np.empty(P.shape + (2, 2), dtype=complex)
+    for idx in np.ndindex(P.shape):
+        S[idx] = cell_smatrix(sim, P[idx], D[idx], modes)
+    return _sweep_results(smatrix_to_tmatrix(S), P, D, neff_tooth, neff_gap, n_periods, wavelength)
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import sys
+    import matplotlib.pyplot as plt
+
+    # --- MODIFY THIS LINE IF YOUR LUMERICAL INSTALLATION IS DIFFERENT ---
+    lumapi_path = r"C:\Program Files\Lumerical\v241\api\python"
+    if lumapi_path not in sys.path:
+        sys.path.append(lumapi_path)
+    import lumapi
+
+    with lumapi.MODE() as mode:
+        neff_tooth, neff_gap = section_indices(mode)
+        print(f"neff tooth = {neff_tooth:.5f}, neff gap = {neff_gap:.5f}")
+
+        # One period with EME gives the radiating cell; cascade it to any length
+        M = smatrix_to_tmatrix(cell_smatrix(mode))
+        K = bloch_wavenumber(M, l_g, dc*neff_tooth.real + (1 - dc)*neff_gap.real)
+        print(f"Bloch decay alpha = {decay_constant(K):.4e} 1/m")
+        print(f"Emission angle = {emission_angle(K):.2f} deg")
+        for n in [10, 40, N, 200]:
+            print(f"N = {n:4d}: emitted fraction = {emitted_fraction(M, n)*100:.2f} %")
+
+    periods = np.linspace(0.5e-6, 0.8e-6, 61)
+    duty_cycles = np.linspace(0.3, 0.8, 51)
+    res = sweep_cell(neff_tooth, neff_gap, periods, duty_cycles)
+    plt.pcolormesh(periods*1e6, duty_cycles, res["angle"].T, shading='auto', cmap='jet')
+    plt.colorbar(label='Emission angle (deg)')
+    plt.xlabel('Period (µm)')
+    plt.ylabel('Duty cycle')
+    plt.title('Grating emission angle from Bloch unit-cell analysis')
+    plt.show()
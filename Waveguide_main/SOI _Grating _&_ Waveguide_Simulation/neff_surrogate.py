@@ -0,0 +1,236 @@
+"""
+Precomputed neff surrogate tables for the SOI waveguide in opa.py.
+
+A table stores neff_i(width, thickness, wavelength) for the first few modes
+on a rectilinear grid. It is built once from FDE solves (or imported from a
+stored Lumerical sweep), saved to .npz, and then queried with vectorized
+tensor-product cubic splines so design loops never need a solver session.
+Leave-one-out residuals (each grid line predicted from the others along its
+axis) give a local error estimate that also works on short axes, and
+refine() inserts new grid lines where that estimate exceeds a tolerance.
+"""
+import numpy as np
+from scipy.interpolate import NdBSpline, make_interp_spline
+
+axis_names = ("width", "thickness", "wavelength")
+n_clad = 1.45
+
+
+# ---- Spline Construction ----
+def _knots(x, k):
+    if k == 1:
+        return np.r_[x[0], x, x[-1]]
+    return make_interp_spline(x, np.zeros_like(x), k=k).t
+
+
+def _spline(axes, values, max_order=3):
+    """Tensor-product interpolating B-spline over the non-singleton axes."""
+    ks = tuple(min(max_order, len(x) - 1) for x in axes)
+    c = values
+    for a, (x, k) in enumerate(zip(axes, ks)):
+        if k == 1:
+            continue
+        # BSpline stores the interpolation axis first; move it back in place
+        c = np.moveaxis(make_interp_spline(x, c, k=k, axis=a).c, 0, a)
+    return NdBSpline(tuple(_knots(x, k) for x, k in zip(axes, ks)), c, ks)
+
+
+class NeffTable:
+    """neff of the first n_modes modes on a (width, thickness, wavelength) grid in meters."""
+
+    def __init__(self, width, thickness, wavelength, neff):
+        self.axes = [np.asarray(a, dtype=float).ravel() for a in (width, thickness, wavelength)]
+        self.neff = np.asarray(neff, dtype=float).reshape([len(a) for a in self.axes] + [-1])
+        self._build()
+
+    def _build(self):
+        # Singleton axes (e.g. a single wavelength) are held fixed
+        self._active = [i for i, a in enumerate(self.axes) if len(a) > 1]
+        frozen = tuple(i for i in range(3) if i not in self._active)
+        axes = [self.axes[i] for i in self._active]
+        self._cubic = _spline(axes, np.squeeze(self.neff, axis=frozen), 3)
+        self._interval_error = {i: np.squeeze(self._interval_residuals(i), axis=frozen)
+                                for i in self._active}
+
+    def _interval_residuals(self, i):
+        """
+        Error estimate per grid interval along axis i: the larger leave-one-out
+        residual of its two end lines. A line is predicted from the remaining
+        lines with the highest spline order they support (extrapolated at the
+        ends), so axes with only 2-4 points still get a finite estimate.
+        """
+        x = self.axes[i]
+        n = len(x)
+        residual = np.zeros_like(self.neff)
+        for j in range(n):
+            keep = np.arange(n) != j
+            line = [slice(None)]*self.neff.ndim
+            line[i] = slice(j, j + 1)
+            line = tuple(line)
+            others = np.compress(keep, self.neff, axis=i)
+            if n == 2:
+                predicted = others
+            else:
+                predicted = make_interp_spline(x[keep], others, k=min(3, n - 2), axis=i)(x[j:j+1])
+            residual[line] = np.abs(predicted - self.neff[line])
+        return np.maximum(np.take(residual, range(n - 1), axis=i), np.take(residual, range(1, n), axis=i))
+
+    @property
+    def n_modes(self):
+        return self.neff.shape[-1]
+
+    def _points(self, width, thickness, wavelength):
+        cols = np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in (width, thickness, wavelength)])
+        shape = cols[0].shape
+        pts = np.stack([cols[i].ravel() for i in self._active], axis=-1)
+        for i in range(3):
+            lo, hi = self.axes[i][0], self.axes[i][-1]
+            if i not in self._active:
+                if np.any(np.abs(cols[i] - lo) > 1e-9*abs(lo)):
+                    raise ValueError(f"{axis_names[i]} is fixed at {lo:.4g} in this table")
+            elif np.any((cols[i] < lo) | (cols[i] > hi)):
+                raise ValueError(f"{axis_names[i]} outside table range [{lo:.4g}, {hi:.4g}]")
+        return pts, shape
+
+    def __call__(self, width, thickness, wavelength):
+        """Interpolated neff with shape broadcast(width, thickness, wavelength) + (n_modes,)."""
+        pts, shape = self._points(width, thickness, wavelength)
+        return self._cubic(pts).reshape(shape + (self.n_modes,))
+
+    def error(self, width, thickness, wavelength):
+        """
+        Local error estimate, same shape as __call__: the leave-one-out
+        residual of the grid interval containing each query point. It is
+        pessimistic, since each residual is taken at twice the grid spacing.
+        """
+        pts, shape = self._points(width, thickness, wavelength)
+        err = np.zeros((len(pts), self.n_modes))
+        for i in self._active:
+            idx = []
+            for c, a in enumerate(self._active):
+                x = self.axes[a]
+                j = np.clip(np.searchsorted(x, pts[:, c]), 1, len(x) - 1)
+                if a != i:
+                    # Nearest grid line on the other axes
+                    j = j - ((pts[:, c] - x[j - 1]) < (x[j] - pts[:, c]))
+                else:
+                    j = j - 1
+                idx.append(j)
+            err = np.maximum(err, self._interval_error[i][tuple(idx)])
+        return err.reshape(shape + (self.n_modes,))
+
+    # ---- Adaptive Refinement ----
+    def refine(self, solve, tol=1e-3, max_rounds=5):
+        """
+        Inserts the midpoint of every grid interval whose estimated error
+        exceeds tol and fills the new grid lines with solve(width, thickness,
+        wavelength) -> neff array. Returns the number of solver calls made.
+        """
+        calls = 0
+        for _ in range(max_rounds):
+            new_axes = []
+            for i in range(3):
+                x = self.axes[i]
+                if i not in self._active:
+                    new_axes.append(x)
+                    continue
+                mids = 0.5*(x[1:] + x[:-1])
+                err = np.moveaxis(self._interval_error[i], self._active.index(i), 0)
+                bad = err.reshape(len(mids), -1).max(axis=1) > tol
+                new_axes.append(np.union1d(x, mids[bad]))
+            if all(len(a) == len(b) for a, b in zip(new_axes, self.axes)):
+                break
+            neff = np.full([len(a) for a in new_axes] + [self.n_modes], np.nan)
+            old = np.ix_(*[np.searchsorted(n, o) for n, o in zip(new_axes, self.axes)])
+            neff[old] = self.neff
+            for idx in zip(*np.nonzero(np.isnan(neff[..., 0]))):
+                neff[idx] = solve(*[new_axes[i][idx[i]] for i in range(3)])
+                calls += 1
+            self.axes = new_axes
+            self.neff = neff
+            self._build()
+        return calls
+
+    # ---- Storage ----
+    def save(self, file_name):
+        np.savez(file_name, width=self.axes[0], thickness=self.axes[1],
+                 wavelength=self.axes[2], neff=self.neff)
+
+    @classmethod
+    def load(cls, file_name):
+        data = np.load(file_name)
+        return cls(data["width"], data["thickness"], data["wavelength"], data["neff"])
+
+
+# ---- Table Building from Lumerical ----
+def fde_solver(sim, n_modes=4):
+    """
+    Returns solve(width, thickness, wavelength) for a session holding the
+    opa.py geometry and FDE region (e.g. its saved simulation.lms).
+    Modes beyond cutoff are filled with the cladding index.
+    """
+    def solve(width, thickness, wavelength):
+        sim.switchtolayout()
+        sim.setnamed("::model::geometry::waveguide", "y span", width)
+        sim.setnamed("::model::geometry::waveguide", "z span", thickness)
+        sim.setnamed("FDE", "wavelength", wavelength)
+        num_found = int(sim.findmodes())
+        neff = np.full(n_modes, n_clad)
+        for i in range(1, min(n_modes, num_found) + 1):
+            neff[i-1] = np.real(sim.getdata(f"FDE::data::mode{i}", "neff")).item()
+        return neff
+    return solve
+
+
+def build_table(solve, widths, thicknesses, wavelengths):
+    """Fills a NeffTable by calling solve() on every grid point."""
+    axes = [np.atleast_1d(np.asarray(a, dtype=float)) for a in (widths, thicknesses, wavelengths)]
+    neff = np.array([solve(w, t, wl) for w in axes[0] for t in axes[1] for wl in axes[2]])
+    return NeffTable(*axes, neff.reshape([len(a) for a in axes] + [-1]))
+
+
+def from_sweep(sim, sweep_name, p, width, thickness, wavelength, n_modes=4):
+    """
+    Imports a stored 1D opa.sweep_parameters() result (p = "width" or
+    "thickness") as a table; the other two axes are fixed at the given values.
+    """
+    x = np.asarray(sim.getsweepresult(sweep_name, "neff1")[p]).ravel()
+    neff = np.stack([np.real(np.asarray(sim.getsweepresult(sweep_name, f"neff{i}")["neff"])).ravel()
+                     for i in range(1, n_modes + 1)], axis=-1)
+    axes = {"width": [width], "thickness": [thickness], "wavelength": [wavelength]}
+    axes[p] = x
+    shape = [len(axes[a]) for a in axis_names] + [n_modes]
+    return NeffTable(axes["width"], axes["thickness"], axes["wavelength"], neff.reshape(shape))
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+
+    table_file = "neff_table.npz"
+    if os.path.exists(table_file):
+        table = NeffTable.load(table_file)
+    else:
+        # --- MODIFY THIS LINE IF YOUR LUMERICAL INSTALLATION IS DIFFERENT ---
+        lumapi_path = r"C:\Program Files\Lumerical\v241\api\python"
+        if lumapi_path not in sys.path:
+            sys.path.append(lumapi_path)
+        import lumapi
+
+        with lumapi.MODE() as mode:
+            # simulation.lms is saved by opa.sweep_parameters() right after setup_fde()
+            mode.load("simulation.lms")
+            solve = fde_solver(mode)
+            table = build_table(solve, np.linspace(0.3e-6, 1.3e-6, 6),
+                                np.linspace(0.05e-6, 0.5e-6, 6), np.linspace(1.5e-6, 1.6e-6, 4))
+            print(f"Refinement used {table.refine(solve, tol=1e-3)} extra FDE solves")
+        table.save(table_file)
+
+    rng = np.random.default_rng(0)
+    q = [rng.uniform(a[0], a[-1], 1_000_000) for a in table.axes]
+    t0 = time.perf_counter()
+    neff = table(*q)
+    dt = time.perf_counter() - t0
+    print(f"{len(q[0])/dt:.3g} queries/s, max error estimate {table.error(*q).max():.2e}")
@@ -0,0 +1,208 @@
+"""
+Group index and dispersion of an FDE mode from a single solve.
+
+The group index follows from the mode fields and the material models at one
+wavelength (Hellmann-Feynman / energy-velocity theorem):
+
+    ng = c * W / P,   W = 1/4 * integral( d(w*eps)/dw |E|^2 + mu0 |H|^2 ) dA
+                      P = 1/2 * integral( Re(E x H*) . x ) dA
+
+with eps the complex permittivity n^2 and d(w*Re(eps))/dw the Brillouin
+energy density, which also holds for metals such as Ag (Re(eps) < 0) as long
+as the loss is moderate. The material derivatives come from getindex()
+queries, which do not need a new findmodes() call.
+
+Only the material part of the GVD (the energy-weighted sum of each
+material's dispersion) comes from a single solve. The waveguide part needs
+the curvature of neff(lambda), so the full GVD still takes a sparse
+multi-wavelength fit: neff and ng at each wavelength give both the value and
+the slope of neff(lambda), so a cubic Hermite fit through 2-3 wavelengths
+replaces 3-5 finite-difference solves per point.
+"""
+import numpy as np
+from scipy.interpolate import CubicHermiteSpline
+
+c = 299792458.0
+eps0 = 8.8541878128e-12
+mu0 = 1.25663706212e-6
+
+
+# ---- Data Extraction (FDE, x-normal) ----
+def mode_fields(sim, mode_number=1):
+    """Returns the y/z grid, E, H, index map and neff of an FDE mode already solved in sim."""
+    mode = f"FDE::data::mode{mode_number}"
+    data = {
+        "y": sim.getdata(mode, "y").flatten(),
+        "z": sim.getdata(mode, "z").flatten(),
+        "f": np.asarray(sim.getdata(mode, "f")).item(),
+        "neff": complex(np.squeeze(sim.getdata(mode, "neff"))),
+    }
+    data["E"] = np.stack([np.squeeze(sim.getdata(mode, comp)) for comp in ("Ex", "Ey", "Ez")])
+    data["H"] = np.stack([np.squeeze(sim.getdata(mode, comp)) for comp in ("Hx", "Hy", "Hz")])
+    data["index"] = np.stack([np.squeeze(sim.getdata("FDE::data::material", comp))
+                              for comp in ("index_x", "index_y", "index_z")])
+    return data
+
+
+def material_models(sim, materials, f0, rel_step=1e-3):
+    """
+    Index and its first two frequency derivatives for each material, from
+    getindex() at f0 and f0*(1 +/- rel_step). No mode solve is involved.
+    """
+    f = f0 * np.array([1 - rel_step, 1, 1 + rel_step])
+    w = 2*np.pi*f
+    dw = w[2] - w[1]
+    # Cells not covered by any structure are vacuum
+    models = {"background": {"n": 1.0, "dn_dw": 0.0, "d2n_dw2": 0.0}}
+    for name in materials:
+        n = np.asarray(sim.getindex(name, f)).ravel()[:3]
+        models[name] = {
+            "n": n[1],
+            "dn_dw": (n[2] - n[0]) / (2*dw),
+            "d2n_dw2": (n[2] - 2*n[1] + n[0]) / dw**2,
+        }
+    return models
+
+
+def assign_materials(index, models):
+    """Labels every grid cell with the material whose index at f0 is closest to the FDE index map."""
+    names = list(models)
+    n0 = np.array([models[m]["n"] for m in names], dtype=complex)
+    # Complex distance, so lossy media (e.g. Ag, Re(n) ~ 0.1) are not mistaken for vacuum
+    label = np.argmin(np.abs(np.asarray(index, dtype=complex)[..., None] - n0), axis=-1)
+    dn_dw = np.array([models[m]["dn_dw"] for m in names], dtype=complex)[label]
+    d2n_dw2 = np.array([models[m]["d2n_dw2"] for m in names], dtype=complex)[label]
+    return label, dn_dw, d2n_dw2
+
+
+# ---- Perturbation Integrals ----
+def _cell_areas(y, z):
+    return np.outer(np.abs(np.gradient(y)), np.abs(np.gradient(z))) if len(y) > 1 and len(z) > 1 \
+        else np.ones((len(y), len(z)))
+
+
+def _energy_permittivity(fields, dn_dw):
+    """d(w*Re(eps))/dw per field component and cell, with eps = eps0*n^2 from the complex index."""
+    w = 2*np.pi*fields["f"]
+    n = np.asarray(fields["index"], dtype=complex)
+    return eps0 * (np.real(n**2) + w*np.real(2*n*np.asarray(dn_dw, dtype=complex)))
+
+
+def group_index(fields, dn_dw):
+    """
+    Group index from one solve. dn_dw (complex) has the shape of
+    fields["index"] (one value per component and grid cell); pass zeros for
+    non-dispersive media.
+    """
+    dA = _cell_areas(fields["y"], fields["z"])
+    E, H = fields["E"], fields["H"]
+    deps = _energy_permittivity(fields, dn_dw)
+    W = 0.25 * np.sum((np.sum(deps*np.abs(E)**2, axis=0) + mu0*np.sum(np.abs(H)**2, axis=0)) * dA)
+    P = 0.5 * np.sum(np.real(E[1]*np.conj(H[2]) - E[2]*np.conj(H[1])) * dA)
+    return c * W / P
+
+
+def energy_fractions(fields, label, dn_dw, n_materials):
+    """Fraction of the electric energy d(w*Re(eps))/dw |E|^2 stored in each material."""
+    dA = _cell_areas(fields["y"], fields["z"])
+    u = _energy_permittivity(fields, dn_dw) * np.abs(fields["E"])**2 * dA
+    frac = np.array([np.sum(u[label == i]) for i in range(n_materials)])
+    return frac / frac.sum()
+
+
+def material_gvd(fields, models, label, dn_dw):
+    """
+    Material contribution to the dispersion parameter D (ps/nm/km): the
+    energy-weighted sum of each material's bulk D = -(lambda/c) d2n/dlambda2.
+    """
+    w = 2*np.pi*fields["f"]
+    lam = c / fields["f"]
+    gamma = energy_fractions(fields, label, dn_dw, len(models))
+    D = []
+    for m in models.values():
+        # d2n/dlambda2 = (w/lam)^2 * (2/w * dn/dw + d2n/dw2)
+        d2n_dl2 = (w/lam)**2 * (2/w*np.real(m["dn_dw"]) + np.real(m["d2n_dw2"]))
+        D.append(-lam/c * d2n_dl2)
+    return np.sum(gamma*np.array(D)) * 1e6
+
+
+def single_solve_dispersion(sim, materials, mode_number=1):
+    """
+    neff, ng and the material GVD of one mode, using only the fields of the
+    current solve. The waveguide GVD is not included; see hermite_dispersion.
+    """
+    fields = mode_fields(sim, mode_number)
+    models = material_models(sim, materials, fields["f"])
+    label, dn_dw, _ = assign_materials(fields["index"], models)
+    return {
+        "wavelength": c / fields["f"],
+        "neff": np.real(fields["neff"]),
+        "ng": group_index(fields, dn_dw),
+        "D_material": material_gvd(fields, models, label, dn_dw),
+    }
+
+
+# ---- Sparse Multi-Wavelength Confirmation ----
+def hermite_dispersion(wavelengths, neff, ng):
+    """
+    Cubic Hermite fit of neff(lambda) through a few wavelengths, using
+    dneff/dlambda = (neff - ng)/lambda from the single-solve group index.
+    Returns a callable D(lambda) in ps/nm/km covering material and waveguide dispersion.
+    """
+    order = np.argsort(wavelengths)
+    lam = np.asarray(wavelengths, dtype=float)[order]
+    neff = np.asarray(neff, dtype=float)[order]
+    ng = np.asarray(ng, dtype=float)[order]
+    spline = CubicHermiteSpline(lam, neff, (neff - ng)/lam)
+    d2 = spline.derivative(2)
+    return lambda wl: -np.asarray(wl)/c * d2(wl) * 1e6
+
+
+def ng_consistency(wavelengths, neff, ng):
+    """Difference between the single-solve ng and a plain finite difference of neff(lambda)."""
+    lam = np.asarray(wavelengths, dtype=float)
+    neff = np.asarray(neff, dtype=float)
+    return np.asarray(ng) - (neff - lam*np.gradient(neff, lam))
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    import sys
+
+    # --- MODIFY THIS LINE IF YOUR LUMERICAL INSTALLATION IS DIFFERENT ---
+    lumapi_path = r"C:\Program Files\Lumerical\v241\api\python"
+    if lumapi_path not in sys.path:
+        sys.path.append(lumapi_path)
+    import lumapi
+
+    materials = ["Si (Silicon) - Palik", "SiO2 (Glass) - Palik"]
+    wg_width = 0.45e-6
+    wg_height = 0.22e-6
+
+    with lumapi.MODE() as mode:
+        mode.newproject()
+        mode.addrect(name="substrate", x_min=0, x_max=5e-6, y_min=-2.5e-6, y_max=2.5e-6,
+                     z_min=-wg_height/2 - 2e-6, z_max=-wg_height/2, material=materials[1])
+        mode.addrect(name="waveguide", x_min=0, x_max=5e-6, y_min=-wg_width/2, y_max=wg_width/2,
+                     z_min=-wg_height/2, z_max=wg_height/2, material=materials[0])
+        mode.addfde(solver_type="2D X normal", x=2.5e-6, y_min=-2e-6, y_max=2e-6,
+                    z_min=-1.5e-6, z_max=1.5e-6, wavelength=1.55e-6)
+        mode.setnamed("FDE", "mesh cells y", 200)
+        mode.setnamed("FDE", "mesh cells z", 200)
+
+        # One solve per wavelength; three sparse wavelengths only to confirm the GVD
+        results = []
+        for wl in [1.50e-6, 1.55e-6, 1.60e-6]:
+            mode.switchtolayout()
+            mode.setnamed("FDE", "wavelength", wl)
+            mode.findmodes()
+            results.append(single_solve_dispersion(mode, materials))
+            r = results[-1]
+            print(f"lambda = {wl*1e9:.0f} nm: neff = {r['neff']:.4f}, ng = {r['ng']:.4f}, "
+                  f"D_material = {r['D_material']:.1f} ps/nm/km")
+
+    lam = [r["wavelength"] for r in results]
+    D = hermite_dispersion(lam, [r["neff"] for r in results], [r["ng"] for r in results])
+    residual = ng_consistency(lam, [r["neff"] for r in results], [r["ng"] for r in results])
+    print(f"Total D at 1550 nm (Hermite fit) = {D(1.55e-6):.1f} ps/nm/km")
+    print(f"ng residual vs finite difference: {np.abs(residual).max():.2e}")
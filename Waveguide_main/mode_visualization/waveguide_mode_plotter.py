@@ -17,11 +17,18 @@ if lumapi_path not in sys.path:
 import lumapi
 
 # --- Main Function to Run the Simulation and Analysis ---
-def run_dual_solve_and_plot():
+def run_dual_solve_and_plot(headless=False, out_dir="mode_profiles"):
     """
     Connects to Lumerical MODE, runs the FDE solver twice, and then
     plots the profile of every mode found in the final run.
+    With headless=True the profiles are rendered to PNG files in out_dir
+    by a background process pool instead of blocking on plt.show().
     """
+    if headless:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Sweep_Tools"))
+        import render
+        render_jobs = []
+
     with lumapi.MODE() as mode:
         print("Successfully connected to Lumerical MODE session.")
         mode.newproject()
@@ -94,6 +101,13 @@ def run_dual_solve_and_plot():
                 if E_intensity.max() > 0:
                     E_intensity /= E_intensity.max()
 
+                if headless:
+                    render_jobs.append(render.mode_job(
+                        y, z, E_intensity, os.path.join(out_dir, f"mode{i}.png"),
+                        title=f"Mode {i} Profile | $n_{{eff}}$ = {np.real(neff).item():.4f}",
+                        core=(-wg_width*1e6/2, -wg_height*1e6/2, wg_width*1e6, wg_height*1e6)))
+                    continue
+
                 # Plot the results
                 fig, ax = plt.subplots(figsize=(8, 6))
                 ax.pcolormesh(y, z, E_intensity.T, shading='gouraud', cmap='jet', vmin=0, vmax=1)
@@ -111,6 +125,10 @@ def run_dual_solve_and_plot():
         else:
             print("No modes were found to plot.")
 
+        if headless and render_jobs:
+            files = render.render(render_jobs)
+            print(f"Rendered {len(files)} mode profiles to '{out_dir}'")
+
         # --- Save the Project File After Running ---
         mode.save(file_name)
         saved_path = os.path.join(os.getcwd(), file_name)
@@ -118,4 +136,11 @@ def run_dual_solve_and_plot():
 
 # --- Execute the script ---
 if __name__ == "__main__":
-    run_dual_solve_and_plot()
+    # python waveguide_mode_plotter.py [--headless] [--out-dir DIR]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FDE dual solve and mode profile plots")
+    parser.add_argument("--headless", action="store_true", help="write PNGs instead of showing figures")
+    parser.add_argument("--out-dir", default="mode_profiles", help="folder for the headless PNGs")
+    args = parser.parse_args()
+    run_dual_solve_and_plot(headless=args.headless, out_dir=args.out_dir)
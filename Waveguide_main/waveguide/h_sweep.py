@@ -15,10 +15,17 @@ if lumapi_path not in sys.path:
     sys.path.append(lumapi_path)
 import lumapi
 
-def sweep_ag_positions():
+def sweep_ag_positions(headless=False, figure_file="ag_position_sweep.png"):
+    """
+    Runs the 10-point Ag position sweep. The result figure is always saved to
+    figure_file; with headless=True it is not shown, so the sweep can run
+    unattended on a server.
+    """
+    if headless:
+        plt.switch_backend("Agg")
     lms_file = r"C:\Users\Sumedh\Downloads\python\Waveguides\AG_DSHP.lms"
     
-    with lumapi.MODE() as mode:
+    with lumapi.MODE(hide=headless) as mode:
         print(f"Loading: {os.path.basename(lms_file)}\n")
         mode.load(lms_file)
         mode.switchtolayout()
@@ -154,7 +161,12 @@ def sweep_ag_positions():
         ax3.legend()
         
         plt.tight_layout()
-        plt.show()
+        fig.savefig(figure_file, dpi=150)
+        print(f"Figure saved to: {figure_file}")
+        if headless:
+            plt.close(fig)
+        else:
+            plt.show()
         
         # Save data
         try:
@@ -168,4 +180,5 @@ def sweep_ag_positions():
             print("Could not save CSV")
 
 if __name__ == "__main__":
-    sweep_ag_positions()
+    # python h_sweep.py [--headless]
+    sweep_ag_positions(headless="--headless" in sys.argv)
@@ -0,0 +1,244 @@
+"""
+Multi-Configuration batching for the Zemax ball lens sweeps.
+
+ball_lens_sweep.py and ball_achromat.py edit surface properties one value at
+a time and open, run and close a new Geometric Image Analysis for every point
+(about six Python <-> OpticStudio round trips per point, one GIA run each).
+
+Here the sweep is split into blocks. Values that are constant within a block
+(the ball radius, its thickness, semi-diameters and the EPD) are set once per
+block directly in the system. Only the value that changes per point (the
+working distance, THIC of surface 2) goes into the Multi-Configuration Editor,
+one configuration per point. The whole block is then evaluated by a single
+merit function calculation: the Merit Function Editor holds a CONF / IMAE pair
+per configuration, IMAE being the Geometric Image Analysis efficiency with the
+settings of the loaded system. Per point this leaves one MCE cell write and
+one merit row read, plus one CalculateMeritFunction call per block.
+
+The user's merit function, the added MCE operands and configurations are all
+restored afterwards.
+"""
+import os
+import numpy as np
+import zospy as zp
+
+
+# ---- GIA Text Output ----
+def parse_efficiency(text_file):
+    """Efficiency (%) from a GIA text file, or None (same parsing as the sweep scripts)."""
+    if not os.path.exists(text_file):
+        return None
+    with open(text_file, 'r', encoding='utf-16') as f:
+        content = f.read()
+    for line in content.split('\n'):
+        if 'Efficiency' in line and ':' in line:
+            try:
+                return float(line.split(':')[1].strip().replace('%', '').strip())
+            except ValueError:
+                pass
+    return None
+
+
+# ---- Multi-Configuration Editor ----
+def add_operands(mce, operands):
+    """
+    Appends one MCE row per (type, param1) pair, e.g. ("THIC", 2) or
+    ("APER", 0). Returns the 1-based row numbers.
+    """
+    rows = []
+    for op_type, param1 in operands:
+        op = mce.AddOperand()
+        op.ChangeType(getattr(zp.constants.Editors.MCE.MultiConfigOperandType, op_type))
+        if param1:
+            op.Param1 = int(param1)
+        rows.append(mce.NumberOfOperands)
+    return rows
+
+
+def config_cells(mce, rows, n_configs):
+    """MCE cells [configuration][operand], fetched once so later writes are one call each."""
+    while mce.NumberOfConfigurations < n_configs:
+        mce.AddConfiguration(False)
+    ops = [mce.GetOperandAt(row) for row in rows]
+    return [[op.GetOperandCell(k) for op in ops] for k in range(1, n_configs + 1)]
+
+
+def reset_mce(mce, n_operands, n_configs):
+    """Removes operands and configurations added after the MCE had the given size."""
+    while mce.NumberOfOperands > n_operands:
+        mce.RemoveOperandAt(mce.NumberOfOperands)
+    while mce.NumberOfConfigurations > n_configs:
+        mce.DeleteConfiguration(mce.NumberOfConfigurations)
+    mce.SetCurrentConfiguration(1)
+
+
+# ---- Merit Function Evaluation ----
+def efficiency_rows(mfe, n_configs, settings_file):
+    """
+    Replaces the merit function with one CONF k / IMAE pair per configuration
+    (weight 0). IMAE reads the GIA settings from the file named in its comment
+    column. Returns the IMAE rows in configuration order.
+    """
+    MFE = zp.constants.Editors.MFE
+    mfe.DeleteAllRows()
+    rows = []
+    for k in range(1, n_configs + 1):
+        conf = mfe.AddOperand() if k > 1 else mfe.GetOperandAt(1)
+        conf.ChangeType(MFE.MeritOperandType.CONF)
+        conf.GetOperandCell(MFE.MeritColumn.Param1).IntegerValue = k
+        imae = mfe.AddOperand()
+        imae.ChangeType(MFE.MeritOperandType.IMAE)
+        imae.GetOperandCell(MFE.MeritColumn.Comment).Value = settings_file
+        imae.Weight = 0
+        rows.append(imae)
+    return rows
+
+
+def gia_efficiency(oss, text_file):
+    """One conventional GIA run on the current configuration, as in the sweep scripts."""
+    gia = oss.Analyses.New_Analysis(zp.constants.Analysis.AnalysisIDM.GeometricImageAnalysis)
+    try:
+        gia.ApplyAndWaitForCompletion()
+        return parse_efficiency(text_file) if gia.GetResults().GetTextFile(text_file) else None
+    finally:
+        gia.Close()
+
+
+# ---- Batched Sweep ----
+def sweep_mce(oss, operands, blocks, work_dir, log=print):
+    """
+    Evaluates the GIA efficiency (%) for every block of sweep points.
+    blocks is a list of (setup, values): setup(oss) applies the values that
+    are fixed within the block (called once) and values[k][j] is MCE operand
+    j in configuration k. The first configuration is cross-checked against a
+    conventional GIA run, which also fixes the IMAE scale (fraction or %).
+    Returns one efficiency array per block (NaN where evaluation failed).
+    """
+    mce, mfe = oss.MCE, oss.MFE
+    n_operands = mce.NumberOfOperands
+    n_configs = mce.NumberOfConfigurations
+    if n_operands or n_configs > 1:
+        raise RuntimeError("The loaded system already uses the Multi-Configuration Editor")
+    blocks = [(setup, np.atleast_2d(np.asarray(values, dtype=float))) for setup, values in blocks]
+    size = max(len(values) for _, values in blocks)
+
+    settings_file = os.path.join(work_dir, "mce_sweep_gia.CFG")
+    saved_mf = os.path.join(work_dir, "mce_sweep_saved.MF")
+    text_file = os.path.join(work_dir, "mce_sweep_check.txt")
+    gia = oss.Analyses.New_Analysis(zp.constants.Analysis.AnalysisIDM.GeometricImageAnalysis)
+    gia.GetSettings().SaveTo(settings_file)
+    gia.Close()
+    mfe.SaveMeritFunction(saved_mf)
+
+    results = []
+    scale = None
+    try:
+        cells = config_cells(mce, add_operands(mce, operands), size)
+        rows = efficiency_rows(mfe, size, settings_file)
+        for b, (setup, values) in enumerate(blocks, 1):
+            setup(oss)
+            for k, point in enumerate(values):
+                for cell, value in zip(cells[k], point):
+                    cell.DoubleValue = float(value)
+            try:
+                mfe.CalculateMeritFunction()
+                eff = np.array([row.Value for row in rows[:len(values)]], dtype=float)
+            except Exception as e:
+                log(f"  Error in block {b}: {e}")
+                eff = np.full(len(values), np.nan)
+            if scale is None and np.isfinite(eff[0]):
+                mce.SetCurrentConfiguration(1)
+                reference = gia_efficiency(oss, text_file)
+                if reference is None:
+                    raise RuntimeError("Could not read the reference GIA efficiency")
+                scale = min((1.0, 100.0), key=lambda s: abs(s*eff[0] - reference))
+                if abs(scale*eff[0] - reference) > 1e-3*max(abs(reference), 1.0):
+                    raise RuntimeError(f"IMAE ({eff[0]}) does not match the GIA efficiency ({reference} %)")
+            results.append(eff*(scale or 1.0))
+            log(f"  Block {b}/{len(blocks)}: {len(values)} points in one merit function evaluation")
+    finally:
+        reset_mce(mce, n_operands, n_configs)
+        mfe.LoadMeritFunction(saved_mf)
+        for path in (settings_file, saved_mf, text_file):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+    return results
+
+
+def ball_lens_blocks(radius_values, distance_values):
+    """
+    Operands and blocks reproducing ball_lens_sweep.py: one block per radius R
+    (ball R / -R, thickness 2R, semi-diameters R, EPD = R, set once), the
+    working distance (surface 2 thickness) varying per configuration.
+    """
+    def setup_for(r):
+        def setup(oss):
+            surface_1 = oss.LDE.GetSurfaceAt(1)
+            surface_2 = oss.LDE.GetSurfaceAt(2)
+            surface_1.Radius = float(r)
+            surface_1.Thickness = float(2*r)
+            surface_1.SemiDiameter = float(r)
+            surface_2.Radius = float(-r)
+            surface_2.SemiDiameter = float(r)
+            oss.SystemData.Aperture.ApertureValue = float(r)
+        return setup
+    values = np.asarray(distance_values, dtype=float)[:, None]
+    return [("THIC", 2)], [(setup_for(r), values) for r in radius_values]
+
+
+# ---- Example Usage ----
+if __name__ == "__main__":
+    # Initialize and connect to ZOS
+    zos = zp.ZOS()
+
+    try:
+        zos.disconnect()
+    except:
+        pass
+
+    oss = zos.connect()
+
+    file_path = r"C:\Users\Sumedh\Downloads\ball lens\ball lens 2.ZOS"
+    oss.load(file_path, saveifneeded=False)
+    print("System loaded successfully")
+
+    lde = oss.LDE
+    surface_1 = lde.GetSurfaceAt(1)
+    surface_2 = lde.GetSurfaceAt(2)
+    sys_aperture = oss.SystemData.Aperture
+
+    # Store original values
+    original = {
+        "radius_1": surface_1.Radius, "thickness_1": surface_1.Thickness,
+        "semi_dia_1": surface_1.SemiDiameter, "radius_2": surface_2.Radius,
+        "semi_dia_2": surface_2.SemiDiameter, "thickness_2": surface_2.Thickness,
+        "aperture": sys_aperture.ApertureValue,
+    }
+
+    radius_values = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+    distance_values = np.arange(0, 61, 1, dtype=float)
+    operands, blocks = ball_lens_blocks(radius_values, distance_values)
+
+    print(f"Evaluating {len(radius_values)} x {len(distance_values)} points through the MCE")
+    efficiencies = sweep_mce(oss, operands, blocks, r"C:\Users\Sumedh\Downloads\ball lens")
+    results = dict(zip(radius_values, efficiencies))
+
+    # Restore original values
+    surface_1.Radius = original["radius_1"]
+    surface_1.Thickness = original["thickness_1"]
+    surface_1.SemiDiameter = original["semi_dia_1"]
+    surface_2.Radius = original["radius_2"]
+    surface_2.SemiDiameter = original["semi_dia_2"]
+    surface_2.Thickness = original["thickness_2"]
+    sys_aperture.ApertureValue = original["aperture"]
+    print("Original configuration restored")
+
+    for radius in radius_values:
+        eff = results[radius]
+        if np.any(~np.isnan(eff)):
+            best_idx = np.nanargmax(eff)
+            print(f"R = {radius:5.1f} mm: optimal distance {distance_values[best_idx]:5.1f} mm, "
+                  f"max efficiency {eff[best_idx]:6.2f} %")